@@ -0,0 +1,275 @@
+# Course: CS261 - Data Structures
+# Author: Lok Wai Wong
+# Assignment: 6
+# Description: Benchmark harness for DirectedGraph and UndirectedGraph
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from d_graph import DirectedGraph
+from ud_graph import UndirectedGraph
+
+KINDS = ('random', 'powerlaw', 'grid')
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def generate(kind: str, m: int, seed: int) -> (int, []):
+    """
+    Return (vertex count, list of (u, v) pairs) for a graph of about m edges
+    - random: m edges between uniformly chosen vertices, average degree 8
+    - powerlaw: preferential attachment, every new vertex links to 4 earlier ones
+    - grid: square lattice, every vertex links to its right and lower neighbor
+    """
+    rnd = random.Random(seed)
+    if kind == 'random':
+        n = max(2, m // 8)
+        return n, [(rnd.randrange(n), rnd.randrange(n)) for _ in range(m)]
+    if kind == 'powerlaw':
+        links = 4
+        n = max(links + 1, m // links)
+        edges = [(u, v) for u in range(links + 1) for v in range(u)]
+        targets = [v for edge in edges for v in edge]
+        for u in range(links + 1, n):
+            for _ in range(links):
+                v = rnd.choice(targets)
+                edges.append((u, v))
+                targets += (u, v)
+        return n, edges
+    if kind == 'grid':
+        side = max(2, math.isqrt(m // 2))
+        edges = []
+        for row in range(side):
+            for col in range(side):
+                v = row * side + col
+                if col + 1 < side:
+                    edges.append((v, v + 1))
+                if row + 1 < side:
+                    edges.append((v, v + side))
+        return side * side, edges
+    raise ValueError(f"unknown graph kind {kind!r}, expected one of {KINDS}")
+
+
+def timed(function, *args, repeat=1, reset=None) -> float:
+    """
+    Return the best of repeat timings of function(*args) in seconds
+    reset() is called before every timing, outside the clock, to drop caches left by earlier calls
+    """
+    best = None
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        function(*args)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+
+def measure(results: dict, name: str, ops: int, seconds: float) -> None:
+    """
+    Record ops operations taking seconds in total under results[name]
+    """
+    results[name] = {'ops': ops, 'seconds': seconds,
+                     'ops_per_sec': ops / seconds if seconds > 0 else None}
+
+
+def peak_memory(build) -> int:
+    """
+    Return peak bytes allocated while build() runs, as traced by tracemalloc
+    """
+    tracemalloc.start()
+    try:
+        build()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def sample_paths(graph_neighbors, starts, length: int) -> []:
+    """
+    Return one random walk of up to length vertices from every start
+    """
+    paths = []
+    rnd = random.Random(0)
+    for v in starts:
+        path = [v]
+        while len(path) < length:
+            neighbors = graph_neighbors(path[-1])
+            if not neighbors:
+                break
+            path.append(rnd.choice(neighbors))
+        paths.append(path)
+    return paths
+
+
+def bench_directed(n: int, pairs: [], storage: str, sources: int, seed: int, repeat=3) -> dict:
+    """
+    Time every public DirectedGraph operation on one graph
+    Operations that do not change the graph report the best of repeat timings
+    """
+    rnd = random.Random(seed)
+    edges = [(u, v, rnd.randint(1, 100)) for u, v in pairs]
+    results = dict()
+
+    graph = DirectedGraph(storage=storage)
+    measure(results, 'add_vertex', n, timed(lambda: [graph.add_vertex() for _ in range(n)]))
+    measure(results, 'add_edge', len(edges),
+            timed(lambda: [graph.add_edge(u, v, w) for u, v, w in edges]))
+    measure(results, 'add_edges_bulk', len(edges),
+            timed(lambda: DirectedGraph.from_edges(edges, n, storage), repeat=repeat))
+    measure(results, 'get_edges', 1, timed(graph.get_edges, repeat=repeat))
+
+    starts = rnd.sample(range(n), min(sources, n))
+    paths = sample_paths(graph._store.successors, starts * 20, 16)
+    measure(results, 'is_valid_path', len(paths),
+            timed(lambda: [graph.is_valid_path(path) for path in paths], repeat=repeat))
+    measure(results, 'dfs', len(starts),
+            timed(lambda: [graph.dfs(v) for v in starts], repeat=repeat))
+    measure(results, 'bfs', len(starts),
+            timed(lambda: [graph.bfs(v) for v in starts], repeat=repeat))
+    measure(results, 'dijkstra', len(starts),
+            timed(lambda: [graph.dijkstra(v) for v in starts], repeat=repeat))
+    measure(results, 'has_cycle', 1, timed(graph.has_cycle, repeat=repeat))
+    if hasattr(graph, 'remove_vertex'):
+        victims = rnd.sample(range(n), max(1, n // 100))
+        measure(results, 'remove_vertex', len(victims),
+                timed(lambda: [graph.remove_vertex(v) for v in victims]))
+
+    results['peak_bytes'] = peak_memory(lambda: DirectedGraph.from_edges(edges, n, storage))
+    return results
+
+
+def bench_undirected(n: int, pairs: [], sources: int, seed: int, repeat=3) -> dict:
+    """
+    Time every public UndirectedGraph operation on one graph
+    Operations that do not change the graph report the best of repeat timings, each one starting
+    without the sorted neighbor lists and union-find cached by the operations timed before it
+    """
+    rnd = random.Random(seed)
+    names = [f'v{i}' for i in range(n)]
+    edges = [(names[u], names[v]) for u, v in pairs]
+    results = dict()
+
+    graph = UndirectedGraph()
+    measure(results, 'add_vertex', n, timed(lambda: [graph.add_vertex(v) for v in names]))
+    measure(results, 'add_edge', len(edges), timed(lambda: [graph.add_edge(u, v) for u, v in edges]))
+    measure(results, 'add_edges_bulk', len(edges),
+            timed(lambda: UndirectedGraph.from_edges(edges), repeat=repeat))
+
+    def reset():
+        graph._touch(*graph.adj_list)
+
+    measure(results, 'get_edges', 1, timed(graph.get_edges, repeat=repeat, reset=reset))
+
+    starts = rnd.sample(names, min(sources, n))
+    paths = sample_paths(lambda v: list(graph.adj_list[v]), starts * 20, 16)
+    measure(results, 'is_valid_path', len(paths),
+            timed(lambda: [graph.is_valid_path(path) for path in paths], repeat=repeat, reset=reset))
+    measure(results, 'dfs', len(starts),
+            timed(lambda: [graph.dfs(v) for v in starts], repeat=repeat, reset=reset))
+    measure(results, 'bfs', len(starts),
+            timed(lambda: [graph.bfs(v) for v in starts], repeat=repeat, reset=reset))
+    measure(results, 'count_connected_components', 1,
+            timed(graph.count_connected_components, repeat=repeat, reset=reset))
+    measure(results, 'has_cycle', 1, timed(graph.has_cycle, repeat=repeat, reset=reset))
+    victims = rnd.sample(names, max(1, n // 100))
+    measure(results, 'remove_vertex', len(victims),
+            timed(lambda: [graph.remove_vertex(v) for v in victims]))
+
+    results['peak_bytes'] = peak_memory(lambda: UndirectedGraph.from_edges(edges))
+    return results
+
+
+def run(kinds=KINDS, sizes=DEFAULT_SIZES, storage='sparse', sources=5, seed=1, repeat=3) -> dict:
+    """
+    Benchmark both graph classes on every kind and size, return a JSON-ready report
+    The report has one entry per run and a curve of seconds against edge count per operation
+    """
+    runs = []
+    for kind in kinds:
+        for size in sizes:
+            n, pairs = generate(kind, size, seed)
+            for graph, results in (
+                    ('directed', bench_directed(n, pairs, storage, sources, seed, repeat)),
+                    ('undirected', bench_undirected(n, pairs, sources, seed, repeat))):
+                runs.append({'graph': graph, 'kind': kind, 'vertices': n,
+                             'edges': len(pairs), 'results': results})
+                print(f'{graph:<10} {kind:<8} {len(pairs):>8} edges', file=sys.stderr)
+
+    curves = dict()
+    for entry in runs:
+        for op, result in entry['results'].items():
+            if op != 'peak_bytes':
+                key = f"{entry['graph']}/{entry['kind']}/{op}"
+                curves.setdefault(key, []).append([entry['edges'], result['seconds']])
+
+    return {'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                     'storage': storage, 'sources': sources, 'seed': seed, 'repeat': repeat},
+            'runs': runs, 'curves': curves}
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> []:
+    """
+    Return a description of every operation that got slower than baseline by more than
+    tolerance (0.25 = 25%), runs missing from either report are ignored
+    """
+    def index(data):
+        return {(run['graph'], run['kind'], run['edges']): run['results'] for run in data['runs']}
+
+    old = index(baseline)
+    regressions = []
+    for key, results in index(report).items():
+        if key not in old:
+            continue
+        for op, result in results.items():
+            before = old[key].get(op)
+            if op == 'peak_bytes' or before is None or before['seconds'] <= 0:
+                continue
+            ratio = result['seconds'] / before['seconds']
+            if ratio > 1 + tolerance:
+                regressions.append(f"{'/'.join(map(str, key))} {op}: {ratio:.2f}x slower")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark DirectedGraph and UndirectedGraph.')
+    parser.add_argument('--kinds', nargs='+', default=list(KINDS), choices=KINDS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES),
+                        help='edge counts, e.g. 1000 10000 100000 1000000')
+    parser.add_argument('--storage', default='sparse', help='DirectedGraph storage backend')
+    parser.add_argument('--sources', type=int, default=5, help='start vertices for traversals')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timings per read-only operation, the best one is reported')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against the baseline (default 0.25)')
+    args = parser.parse_args(argv)
+
+    report = run(args.kinds, args.sizes, args.storage, args.sources, args.seed, args.repeat)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for line in regressions:
+            print('REGRESSION', line, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,8 +3,855 @@
 # Assignment: 6
 # Description: Implementing a directed weighted graph
 
+import bisect
 import heapq
-from collections import deque
+import mmap
+import multiprocessing
+import os
+import sys
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+import graph_io
+import graph_journal
+from graph_async import collecting, drain, run_steps
+from graph_journal import Journal
+from graph_stats import OperationStats
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# vertex colors used by DirectedGraph.dfs_helper()
+WHITE, GRAY, BLACK = 0, 1, 2
+
+
+class DenseStorage:
+    """
+    Adjacency matrix storage, a list of weights per vertex
+    - O(V^2) memory, O(1) edge lookup
+    - best for small or dense graphs
+    """
+
+    readonly = False
+    row_scan = True
+    __slots__ = ('rows',)
+
+    def __init__(self):
+        self.rows = []
+
+    def add_vertex(self) -> None:
+        """
+        Append one zero column to every row and a new zero row.
+        """
+        self.add_vertices(1)
+
+    def add_vertices(self, n: int) -> None:
+        """
+        Append n zero columns to every row and n new zero rows.
+        """
+        padding = [0] * n
+        for row in self.rows:
+            row.extend(padding)
+        size = len(self.rows) + n
+        self.rows.extend([0] * size for _ in range(n))
+
+    def get_weight(self, src: int, dst: int):
+        """
+        Return the weight of edge src -> dst, 0 if there is no such edge.
+        """
+        return self.rows[src][dst]
+
+    def set_weight(self, src: int, dst: int, weight) -> None:
+        """
+        Set the weight of edge src -> dst, a weight of 0 removes the edge.
+        """
+        self.rows[src][dst] = weight
+
+    def set_weights(self, edges) -> None:
+        """
+        Apply set_weight() to every (src, dst, weight) triple, in order.
+        """
+        rows = self.rows
+        for src, dst, weight in edges:
+            rows[src][dst] = weight
+
+    def neighbors(self, v: int) -> []:
+        """
+        Return (dst, weight) pairs of the edges leaving v, in ascending dst order.
+        """
+        return [(col, weight) for col, weight in enumerate(self.rows[v]) if weight != 0]
+
+    def successors(self, v: int) -> []:
+        """
+        Return the heads of the edges leaving v, in ascending order.
+        """
+        return [col for col, weight in enumerate(self.rows[v]) if weight != 0]
+
+    def edges(self) -> []:
+        """
+        Return (src, dst, weight) triples of all edges in row-major order.
+        """
+        return [(row, col, weight)
+                for row, cells in enumerate(self.rows)
+                for col, weight in enumerate(cells) if weight != 0]
+
+    def matrix(self) -> []:
+        """
+        Return the adjacency matrix itself.
+        """
+        return self.rows
+
+    def nbytes(self) -> int:
+        """
+        Return the size of the row lists in bytes, shared int objects not counted.
+        """
+        return sys.getsizeof(self.rows) + sum(map(sys.getsizeof, self.rows))
+
+
+class SparseStorage:
+    """
+    Adjacency list storage, a dict of {dst: weight} per vertex
+    - O(V + E) memory, O(1) edge lookup, O(out-degree) neighbor scan
+    - every dict is kept in ascending dst order, rows that got an edge out of order are
+      sorted in one pass before the next read, so loading a row in any order is O(d log d)
+    - best for large graphs with a low average degree
+    """
+
+    readonly = False
+    row_scan = False
+    __slots__ = ('rows', 'unsorted')
+
+    def __init__(self):
+        self.rows = []
+        self.unsorted = set()
+
+    def add_vertex(self) -> None:
+        """
+        Append an empty neighbor dict.
+        """
+        self.rows.append({})
+
+    def add_vertices(self, n: int) -> None:
+        """
+        Append n empty neighbor dicts.
+        """
+        self.rows.extend({} for _ in range(n))
+
+    def get_weight(self, src: int, dst: int):
+        """
+        Return the weight of edge src -> dst, 0 if there is no such edge.
+        """
+        return self.rows[src].get(dst, 0)
+
+    def set_weight(self, src: int, dst: int, weight) -> None:
+        """
+        Set the weight of edge src -> dst, a weight of 0 removes the edge.
+        """
+        row = self.rows[src]
+        if weight == 0:
+            row.pop(dst, None)
+            return
+        if row and dst not in row and dst < next(reversed(row)):
+            self.unsorted.add(src)
+        row[dst] = weight
+
+    def set_weights(self, edges) -> None:
+        """
+        Apply set_weight() to every (src, dst, weight) triple, in order.
+        The changed rows are only sorted by the next read, so repeated bulk loads sort them once.
+        """
+        rows = self.rows
+        unsorted = self.unsorted
+        for src, dst, weight in edges:
+            if weight == 0:
+                rows[src].pop(dst, None)
+            else:
+                rows[src][dst] = weight
+            unsorted.add(src)
+
+    def sort_rows(self) -> None:
+        """
+        Sort the rows changed out of order by set_weight() or set_weights().
+        """
+        rows = self.rows
+        for src in self.unsorted:
+            if len(rows[src]) > 1:
+                rows[src] = dict(sorted(rows[src].items()))
+        self.unsorted.clear()
+
+    def neighbors(self, v: int) -> []:
+        """
+        Return (dst, weight) pairs of the edges leaving v, in ascending dst order.
+        """
+        if self.unsorted:
+            self.sort_rows()
+        return list(self.rows[v].items())
+
+    def successors(self, v: int) -> []:
+        """
+        Return the heads of the edges leaving v, in ascending order.
+        """
+        if self.unsorted:
+            self.sort_rows()
+        return list(self.rows[v])
+
+    def edges(self) -> []:
+        """
+        Return (src, dst, weight) triples of all edges in row-major order.
+        """
+        if self.unsorted:
+            self.sort_rows()
+        return [(row, col, weight)
+                for row, cells in enumerate(self.rows)
+                for col, weight in cells.items()]
+
+    def matrix(self) -> []:
+        """
+        Return a dense copy of the adjacency matrix.
+        """
+        if self.unsorted:
+            self.sort_rows()
+        size = len(self.rows)
+        matrix = []
+        for cells in self.rows:
+            row = [0] * size
+            for col, weight in cells.items():
+                row[col] = weight
+            matrix.append(row)
+        return matrix
+
+    def nbytes(self) -> int:
+        """
+        Return the size of the row dicts in bytes, shared int objects not counted.
+        """
+        return sys.getsizeof(self.rows) + sum(map(sys.getsizeof, self.rows))
+
+
+class NumpyStorage:
+    """
+    Adjacency matrix storage in a float64 NumPy array (requires numpy)
+    - same complexity as DenseStorage, row scans and edge lists are vectorized
+    - the array grows by doubling so add_vertex() is amortized O(V)
+    """
+
+    readonly = False
+    row_scan = True
+    __slots__ = ('size', 'buffer')
+
+    def __init__(self):
+        self.size = 0
+        self.buffer = np.zeros((0, 0))
+
+    @property
+    def array(self):
+        """
+        The adjacency matrix, a view of the used part of the buffer
+        """
+        return self.buffer[:self.size, :self.size]
+
+    def add_vertex(self) -> None:
+        """
+        Add one zero row and column.
+        """
+        self.add_vertices(1)
+
+    def add_vertices(self, n: int) -> None:
+        """
+        Add n zero rows and columns, reallocating the buffer only when it is full.
+        """
+        size = self.size + n
+        if size > len(self.buffer):
+            buffer = np.zeros((max(size, 2 * len(self.buffer)),) * 2)
+            buffer[:self.size, :self.size] = self.array
+            self.buffer = buffer
+        else:
+            self.buffer[self.size:size, :size] = 0
+            self.buffer[:size, self.size:size] = 0
+        self.size = size
+
+    def get_weight(self, src: int, dst: int):
+        """
+        Return the weight of edge src -> dst, 0 if there is no such edge.
+        """
+        return self.buffer[src, dst].item()
+
+    def set_weight(self, src: int, dst: int, weight) -> None:
+        """
+        Set the weight of edge src -> dst, a weight of 0 removes the edge.
+        """
+        self.buffer[src, dst] = weight
+
+    def set_weights(self, edges) -> None:
+        """
+        Apply set_weight() to every (src, dst, weight) triple with one fancy-indexed assignment.
+        When a (src, dst) pair repeats the last triple wins, as with sequential set_weight() calls.
+        """
+        edges = list(edges)
+        if not edges:
+            return
+        src, dst, weight = (np.asarray(column) for column in zip(*edges))
+        key = src.astype(np.int64) * self.size + dst
+        _, last = np.unique(key[::-1], return_index=True)
+        keep = len(key) - 1 - last
+        self.buffer[src[keep], dst[keep]] = weight[keep]
+
+    def neighbors(self, v: int) -> []:
+        """
+        Return (dst, weight) pairs of the edges leaving v, in ascending dst order.
+        """
+        row = self.buffer[v, :self.size]
+        cols = np.flatnonzero(row)
+        return list(zip(cols.tolist(), row[cols].tolist()))
+
+    def successors(self, v: int) -> []:
+        """
+        Return the heads of the edges leaving v, in ascending order.
+        """
+        return np.flatnonzero(self.buffer[v, :self.size]).tolist()
+
+    def edges(self) -> []:
+        """
+        Return (src, dst, weight) triples of all edges in row-major order.
+        """
+        array = self.array
+        rows, cols = np.nonzero(array)
+        return list(zip(rows.tolist(), cols.tolist(), array[rows, cols].tolist()))
+
+    def matrix(self) -> []:
+        """
+        Return the adjacency matrix as a list of lists.
+        """
+        return self.array.tolist()
+
+    def nbytes(self) -> int:
+        """
+        Return the size of the array buffer in bytes.
+        """
+        return self.buffer.nbytes
+
+
+class CompactStorage:
+    """
+    Adjacency matrix storage with one array per row, 4 bytes per cell
+    - weights are unsigned 32-bit ints ('I'), the rows switch to doubles ('d')
+      the first time a weight does not fit
+    - same complexity as DenseStorage at half the memory or less
+    """
+
+    readonly = False
+    row_scan = True
+    __slots__ = ('rows', 'typecode')
+
+    def __init__(self):
+        self.rows = []
+        self.typecode = 'I'
+
+    def add_vertex(self) -> None:
+        """
+        Add one zero row and column.
+        """
+        self.add_vertices(1)
+
+    def add_vertices(self, n: int) -> None:
+        """
+        Append n zero cells to every row and n new zero rows.
+        """
+        padding = array(self.typecode, [0]) * n
+        for row in self.rows:
+            row.extend(padding)
+        size = len(self.rows) + n
+        self.rows.extend(array(self.typecode, [0]) * size for _ in range(n))
+
+    def get_weight(self, src: int, dst: int):
+        """
+        Return the weight of edge src -> dst, 0 if there is no such edge.
+        """
+        return self.rows[src][dst]
+
+    def set_weight(self, src: int, dst: int, weight) -> None:
+        """
+        Set the weight of edge src -> dst, a weight of 0 removes the edge.
+        """
+        try:
+            self.rows[src][dst] = weight
+        except (TypeError, OverflowError):
+            self.typecode = 'd'
+            self.rows = [array('d', row) for row in self.rows]
+            self.rows[src][dst] = weight
+
+    def set_weights(self, edges) -> None:
+        """
+        Apply set_weight() to every (src, dst, weight) triple, in order.
+        """
+        for src, dst, weight in edges:
+            self.set_weight(src, dst, weight)
+
+    def neighbors(self, v: int) -> []:
+        """
+        Return (dst, weight) pairs of the edges leaving v, in ascending dst order.
+        """
+        return [(col, weight) for col, weight in enumerate(self.rows[v]) if weight != 0]
+
+    def successors(self, v: int) -> []:
+        """
+        Return the heads of the edges leaving v, in ascending order.
+        """
+        return [col for col, weight in enumerate(self.rows[v]) if weight != 0]
+
+    def edges(self) -> []:
+        """
+        Return (src, dst, weight) triples of all edges in row-major order.
+        """
+        return [(row, col, weight)
+                for row, cells in enumerate(self.rows)
+                for col, weight in enumerate(cells) if weight != 0]
+
+    def matrix(self) -> []:
+        """
+        Return a dense copy of the adjacency matrix.
+        """
+        return [row.tolist() for row in self.rows]
+
+    def nbytes(self) -> int:
+        """
+        Return the size of the row arrays in bytes.
+        """
+        return sys.getsizeof(self.rows) + sum(map(sys.getsizeof, self.rows))
+
+
+# bit positions set in every byte value, used to scan BitsetStorage rows
+_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+class BitsetStorage:
+    """
+    Adjacency bit matrix for unweighted graphs, one bit per cell
+    - every edge has weight 1, setting any positive weight stores an edge of weight 1
+    - O(V^2 / 8) bytes, O(1) edge lookup, O(V / 8) neighbor scan
+    """
+
+    readonly = False
+    row_scan = True
+    __slots__ = ('rows', 'size')
+
+    def __init__(self):
+        self.rows = []
+        self.size = 0
+
+    def add_vertex(self) -> None:
+        """
+        Add one zero row and column.
+        """
+        self.add_vertices(1)
+
+    def add_vertices(self, n: int) -> None:
+        """
+        Widen every row to cover n more columns and append n new zero rows.
+        """
+        self.size += n
+        width = (self.size + 7) >> 3
+        for row in self.rows:
+            row.extend(bytes(width - len(row)))
+        self.rows.extend(bytearray(width) for _ in range(n))
+
+    def get_weight(self, src: int, dst: int):
+        """
+        Return 1 if there is an edge src -> dst, 0 otherwise.
+        """
+        return self.rows[src][dst >> 3] >> (dst & 7) & 1
+
+    def set_weight(self, src: int, dst: int, weight) -> None:
+        """
+        Add edge src -> dst if weight is positive, remove it if weight is 0.
+        """
+        if weight:
+            self.rows[src][dst >> 3] |= 1 << (dst & 7)
+        else:
+            self.rows[src][dst >> 3] &= ~(1 << (dst & 7)) & 0xFF
+
+    def set_weights(self, edges) -> None:
+        """
+        Apply set_weight() to every (src, dst, weight) triple, in order.
+        """
+        for src, dst, weight in edges:
+            self.set_weight(src, dst, weight)
+
+    def successors(self, v: int) -> []:
+        """
+        Return the heads of the edges leaving v, in ascending order.
+        """
+        cols = []
+        for index, byte in enumerate(self.rows[v]):
+            if byte:
+                base = index << 3
+                cols.extend(base + bit for bit in _BITS[byte])
+        return cols
+
+    def neighbors(self, v: int) -> []:
+        """
+        Return (dst, 1) pairs of the edges leaving v, in ascending dst order.
+        """
+        return [(col, 1) for col in self.successors(v)]
+
+    def edges(self) -> []:
+        """
+        Return (src, dst, 1) triples of all edges in row-major order.
+        """
+        return [(row, col, 1) for row in range(len(self.rows)) for col in self.successors(row)]
+
+    def matrix(self) -> []:
+        """
+        Return a dense copy of the adjacency matrix.
+        """
+        matrix = []
+        for v in range(len(self.rows)):
+            row = [0] * self.size
+            for col in self.successors(v):
+                row[col] = 1
+            matrix.append(row)
+        return matrix
+
+    def nbytes(self) -> int:
+        """
+        Return the size of the row bytearrays in bytes.
+        """
+        return sys.getsizeof(self.rows) + sum(map(sys.getsizeof, self.rows))
+
+
+class CSRStorage:
+    """
+    Read-only compressed sparse row storage over the buffers of a mapped graph file
+    - O(V + E) memory shared with the page cache, nothing is copied on load
+    - neighbor scans read straight from the mapping, edge lookup is a binary search
+    - DirectedGraph switches to SparseStorage on the first change
+    """
+
+    readonly = True
+    row_scan = False
+    __slots__ = ('file', 'offsets', 'targets', 'weights')
+
+    def __init__(self, csr_file):
+        self.file = csr_file
+        self.offsets = csr_file.offsets
+        self.targets = csr_file.targets
+        self.weights = csr_file.weights
+
+    def get_weight(self, src: int, dst: int):
+        """
+        Return the weight of edge src -> dst, 0 if there is no such edge.
+        """
+        lo, hi = self.offsets[src], self.offsets[src + 1]
+        index = bisect.bisect_left(self.targets, dst, lo, hi)
+        if index < hi and self.targets[index] == dst:
+            return self.weights[index]
+        return 0
+
+    def neighbors(self, v: int) -> []:
+        """
+        Return (dst, weight) pairs of the edges leaving v, in ascending dst order.
+        """
+        lo, hi = self.offsets[v], self.offsets[v + 1]
+        return list(zip(self.targets[lo:hi].tolist(), self.weights[lo:hi].tolist()))
+
+    def successors(self, v: int) -> []:
+        """
+        Return the heads of the edges leaving v, in ascending order.
+        """
+        return self.targets[self.offsets[v]:self.offsets[v + 1]].tolist()
+
+    def edges(self) -> []:
+        """
+        Return (src, dst, weight) triples of all edges in row-major order.
+        """
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        return [(src, targets[i], weights[i])
+                for src in range(len(offsets) - 1)
+                for i in range(offsets[src], offsets[src + 1])]
+
+    def matrix(self) -> []:
+        """
+        Return a dense copy of the adjacency matrix.
+        """
+        size = len(self.offsets) - 1
+        matrix = [[0] * size for _ in range(size)]
+        for src, dst, weight in self.edges():
+            matrix[src][dst] = weight
+        return matrix
+
+    def nbytes(self) -> int:
+        """
+        Return the size of the mapped file in bytes, shared with every process that maps it.
+        """
+        return len(self.file.mmap)
+
+
+class SubgraphStorage:
+    """
+    Read-only storage showing the edges of another storage between a set of its vertices
+    - nothing is copied, rows are filtered from the underlying storage when they are read
+    - used by DirectedSubgraph, the underlying storage must not change while it is in use
+    """
+
+    readonly = True
+    __slots__ = ('store', 'vertices', 'size')
+
+    def __init__(self, store, vertices, size: int):
+        self.store = store
+        self.vertices = vertices
+        self.size = size
+
+    @property
+    def row_scan(self) -> bool:
+        return self.store.row_scan
+
+    def get_weight(self, src: int, dst: int):
+        """
+        Return the weight of edge src -> dst, 0 if there is no such edge in the subgraph.
+        """
+        if src in self.vertices and dst in self.vertices:
+            return self.store.get_weight(src, dst)
+        return 0
+
+    def neighbors(self, v: int) -> []:
+        """
+        Return (dst, weight) pairs of the edges leaving v inside the subgraph, in ascending dst order.
+        """
+        vertices = self.vertices
+        if v not in vertices:
+            return []
+        return [(dst, weight) for dst, weight in self.store.neighbors(v) if dst in vertices]
+
+    def successors(self, v: int) -> []:
+        """
+        Return the heads of the edges leaving v inside the subgraph, in ascending order.
+        """
+        vertices = self.vertices
+        if v not in vertices:
+            return []
+        return [dst for dst in self.store.successors(v) if dst in vertices]
+
+    def edges(self) -> []:
+        """
+        Return (src, dst, weight) triples of all edges of the subgraph in row-major order.
+        """
+        return [(src, dst, weight)
+                for src in sorted(self.vertices) for dst, weight in self.neighbors(src)]
+
+    def matrix(self) -> []:
+        """
+        Return a dense copy of the adjacency matrix, rows and columns outside the subgraph are 0.
+        """
+        matrix = [[0] * self.size for _ in range(self.size)]
+        for src, dst, weight in self.edges():
+            matrix[src][dst] = weight
+        return matrix
+
+    def nbytes(self) -> int:
+        """
+        Return the size of the vertex set in bytes, the edges belong to the underlying storage.
+        """
+        return sys.getsizeof(self.vertices)
+
+
+class Complement:
+    """
+    Set-like complement of a vertex set within range(size)
+    A DirectedSubgraph uses it as its removed vertices, so the ids outside the view are
+    skipped exactly like tombstones without being stored
+    """
+
+    __slots__ = ('vertices', 'size')
+
+    def __init__(self, vertices, size: int):
+        self.vertices = vertices
+        self.size = size
+
+    def __contains__(self, v):
+        return v not in self.vertices
+
+    def __iter__(self):
+        vertices = self.vertices
+        return (v for v in range(self.size) if v not in vertices)
+
+    def __len__(self):
+        return self.size - len(self.vertices)
+
+
+STORAGES = {'dense': DenseStorage, 'sparse': SparseStorage,
+            'compact': CompactStorage, 'bitset': BitsetStorage}
+if np is not None:
+    STORAGES['numpy'] = NumpyStorage
+
+
+# graph and output buffer shared with forked dijkstra_many() / bfs_many() workers
+_shared_graph = None
+_shared_out = None
+
+
+def _many_worker(task):
+    """
+    Fill the output rows of a chunk of sources, runs in a forked worker process
+    """
+    method, first, sources = task
+    v_count = _shared_graph.v_count
+    search = getattr(_shared_graph, method)
+    for row, src in enumerate(sources, first):
+        _shared_out[row * v_count:(row + 1) * v_count] = array('d', search(src))
+
+
+class ShortestPathCache:
+    """
+    LRU cache of shortest path trees (distances, predecessors) keyed by source vertex
+    - the memory budget is in bytes, estimated from the size of the cached lists
+    - an edge change only drops the trees it can actually change
+    - hits, misses, evictions and invalidations are counted for tuning the budget
+    """
+
+    __slots__ = ('max_bytes', 'entries', 'bytes', 'hits', 'misses', 'evictions', 'invalidations')
+
+    def __init__(self, max_bytes=64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _size(dist, pred) -> int:
+        return sys.getsizeof(dist) + sys.getsizeof(pred)
+
+    def get(self, src: int):
+        """
+        Return the cached (dist, pred) lists of src, None on a miss.
+        """
+        entry = self.entries.get(src)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(src)
+        return entry
+
+    def put(self, src: int, dist: [], pred: []) -> None:
+        """
+        Cache the tree of src, evicting least recently used trees to stay within the budget.
+        """
+        size = self._size(dist, pred)
+        if size > self.max_bytes:
+            return
+        self.discard(src)
+        self.entries[src] = (dist, pred)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (old_dist, old_pred) = self.entries.popitem(last=False)
+            self.bytes -= self._size(old_dist, old_pred)
+            self.evictions += 1
+
+    def discard(self, src: int) -> None:
+        """
+        Drop the tree of src if it is cached.
+        """
+        entry = self.entries.pop(src, None)
+        if entry is not None:
+            self.bytes -= self._size(*entry)
+
+    def clear(self) -> None:
+        """
+        Drop every cached tree.
+        """
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        self.bytes = 0
+
+    def vertices_added(self, n: int) -> None:
+        """
+        Extend every cached tree with n new unreachable vertices.
+        """
+        self.bytes = 0
+        for dist, pred in self.entries.values():
+            dist.extend([float('inf')] * n)
+            pred.extend([None] * n)
+            self.bytes += self._size(dist, pred)
+
+    def edge_changed(self, src: int, dst: int, old, new) -> None:
+        """
+        Drop the trees made stale by edge src -> dst changing weight from old to new (0 = no edge).
+        A new or cheaper edge only matters if it shortens the way to dst, a dearer or removed edge
+        only matters if it is the tree edge into dst.
+        """
+        if old == new:
+            return
+        if old == 0 or 0 < new < old:
+            stale = [s for s, (dist, _) in self.entries.items() if dist[src] + new < dist[dst]]
+        else:
+            stale = [s for s, (_, pred) in self.entries.items() if pred[dst] == src]
+        for s in stale:
+            self.discard(s)
+        self.invalidations += len(stale)
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+        """
+        return {'entries': len(self.entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations}
+
+
+class ReverseIndex:
+    """
+    Incrementally maintained reverse adjacency of a DirectedGraph
+    - preds[v] is a {src: weight} dict of the edges entering v
+    - in_degree and out_degree count the edges entering and leaving every vertex
+    - every edge change costs O(1), a bulk load rebuilds the index in O(V + E)
+    """
+
+    __slots__ = ('preds', 'in_degree', 'out_degree')
+
+    def __init__(self, store=None, v_count=0):
+        self.preds = [{} for _ in range(v_count)]
+        self.in_degree = array('q', bytes(8 * v_count))
+        self.out_degree = array('q', bytes(8 * v_count))
+        if store is not None:
+            for src, dst, weight in store.edges():
+                self.preds[dst][src] = weight
+                self.in_degree[dst] += 1
+                self.out_degree[src] += 1
+
+    def vertices_added(self, n: int) -> None:
+        """
+        Add n vertices without edges.
+        """
+        self.preds.extend({} for _ in range(n))
+        self.in_degree.frombytes(bytes(8 * n))
+        self.out_degree.frombytes(bytes(8 * n))
+
+    def edge_changed(self, src: int, dst: int, old, new) -> None:
+        """
+        Record edge src -> dst changing weight from old to new (0 = no edge).
+        """
+        if new:
+            self.preds[dst][src] = new
+            if not old:
+                self.in_degree[dst] += 1
+                self.out_degree[src] += 1
+        elif old:
+            del self.preds[dst][src]
+            self.in_degree[dst] -= 1
+            self.out_degree[src] -= 1
+
+    def reverse_neighbors(self, v: int) -> []:
+        """
+        Return (src, weight) pairs of the edges entering v in ascending src order.
+        """
+        return sorted(self.preds[v].items())
+
 
 class DirectedGraph:
     """
@@ -13,39 +860,145 @@ class DirectedGraph:
     - loops not allowed
     - only positive edge weights
     - vertex names are integers
+    - storage is 'dense' (adjacency matrix), 'sparse' (adjacency dicts),
+      'compact' (adjacency matrix of 4 byte arrays), 'bitset' (adjacency bit matrix,
+      unweighted) or 'numpy' (adjacency matrix as an ndarray, if numpy is installed),
+      graphs returned by load() use the read-only 'csr' storage
+    - enable_index() keeps a ReverseIndex of incoming edges and degrees up to date
+    - enable_journal() records every change in a Journal that replay() can apply again
+    - removed vertices leave tombstones, their ids are reused by add_vertex_id() until compact()
+    - subgraph() and k_hop() return zero-copy DirectedSubgraph views
     """
 
-    def __init__(self, start_edges=None):
+    __slots__ = ('v_count', 'storage', '_store', '_reverse', 'cache', 'stats', 'index', 'journal',
+                 'free_ids', '_removed')
+
+    def __init__(self, start_edges=None, storage='dense'):
         """
-        Store graph info as adjacency matrix
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Store graph info in the requested storage backend
         """
+        if storage not in STORAGES:
+            raise ValueError(f"unknown storage {storage!r}, expected one of {sorted(STORAGES)}")
         self.v_count = 0
-        self.adj_matrix = []
+        self.storage = storage
+        self._store = STORAGES[storage]()
+        self._reverse = None
+        self.cache = None
+        self.stats = None
+        self.index = None
+        self.journal = None
+        self.free_ids = []
+        self._removed = set()
 
         # populate graph with initial vertices and edges (if provided)
-        # before using, implement add_vertex() and add_edge() methods
         if start_edges is not None:
             v_count = 0
             for u, v, _ in start_edges:
                 v_count = max(v_count, u, v)
-            for _ in range(v_count + 1):
-                self.add_vertex()
-            for u, v, weight in start_edges:
-                self.add_edge(u, v, weight)
+            self.add_vertices(v_count + 1)
+            self.add_edges_bulk(start_edges)
+
+    @classmethod
+    def from_edges(cls, edges, v_count=None, storage='dense', rejected=None):
+        """
+        This method builds a graph from an iterable of (src, dst, weight) triples.
+        With v_count given the edges are consumed in a single pass, so edges can be a generator,
+        otherwise the graph gets max(vertex) + 1 vertices like the constructor.
+        The sparse rows are sorted before the graph is returned, so reading a fresh graph, e.g. a
+        copy() handed to a Snapshot, never changes it and is safe from several threads.
+        """
+        graph = cls(storage=storage)
+        if v_count is None:
+            edges = list(edges)
+            v_count = max((max(u, v) for u, v, _ in edges), default=0) + 1
+        graph.add_vertices(v_count)
+        graph.add_edges_bulk(edges, rejected)
+        if isinstance(graph._store, SparseStorage):
+            graph._store.sort_rows()
+        return graph
+
+    def copy(self):
+        """
+        This method returns an independent copy of the graph with the same storage. A read-only
+        storage is shared instead of copied. The index is rebuilt if it is enabled, the cache
+        and stats are not copied.
+        """
+        if self._store.readonly:
+            graph = type(self)()
+            graph._store = self._store
+            graph.storage = self.storage
+            graph.v_count = self.v_count
+        else:
+            graph = type(self).from_edges(self._store.edges(), self.v_count, self.storage)
+        graph.free_ids = list(self.free_ids)
+        graph._removed = set(self._removed)
+        if self.index is not None:
+            graph.enable_index()
+        return graph
+
+    def settle(self) -> None:
+        """
+        This method finishes the work the storage defers to the next read (sorting the sparse
+        rows changed out of order), so that reading the graph from several threads never changes
+        it. VersionedGraph calls it before it hands the graph to readers.
+        """
+        if isinstance(self._store, SparseStorage):
+            self._store.sort_rows()
+
+    def subgraph(self, vertices, materialize=False):
+        """
+        This method returns the subgraph induced by the given vertices: those vertices and every
+        edge between them. By default it is a read-only DirectedSubgraph view that filters the
+        edges of this graph when they are read, nothing is copied. With materialize=True it is a
+        (graph, mapping) pair instead, a standalone graph and the dict mapping the ids of this graph
+        to its renumbered ids, see DirectedSubgraph.materialize(). Unknown vertices are skipped.
+        """
+        view = DirectedSubgraph(self, vertices)
+        return view.materialize() if materialize else view
+
+    def k_hop(self, v: int, k: int, materialize=False):
+        """
+        This method returns the subgraph induced by the vertices v can reach with at most k edges,
+        found by a BFS that stops after k levels, as a view or a (graph, mapping) pair like
+        subgraph().
+        The subgraph is empty if v is not in the graph or k is negative.
+        """
+        reached = set()
+        if 0 <= v < self.v_count and v not in self._removed and k >= 0:
+            successors = self._store.successors
+            reached.add(v)
+            frontier = [v]
+            for _ in range(k):
+                next_frontier = []
+                for u in frontier:
+                    for w in successors(u):
+                        if w not in reached:
+                            reached.add(w)
+                            next_frontier.append(w)
+                if not next_frontier:
+                    break
+                frontier = next_frontier
+        return self.subgraph(reached, materialize)
+
+    @property
+    def adj_matrix(self) -> []:
+        """
+        Adjacency matrix of the graph, a dense copy for the sparse storage
+        """
+        return self._store.matrix()
 
     def __str__(self):
         """
         Return content of the graph in human-readable form
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
         if self.v_count == 0:
             return 'EMPTY GRAPH\n'
         out = '   |'
         out += ' '.join(['{:2}'.format(i) for i in range(self.v_count)]) + '\n'
         out += '-' * (self.v_count * 3 + 3) + '\n'
+        adj_matrix = self.adj_matrix
         for i in range(self.v_count):
-            row = self.adj_matrix[i]
+            row = adj_matrix[i]
             out += '{:2} |'.format(i)
             out += ' '.join(['{:2}'.format(w) for w in row]) + '\n'
         out = f"GRAPH ({self.v_count} vertices):\n{out}"
@@ -55,50 +1008,315 @@ class DirectedGraph:
 
     def add_vertex(self) -> int:
         """
-        This method adds a new vertex to the graph.
+        This method adds a new vertex to the graph and returns the vertex count, the new vertex
+        always gets the id v_count - 1. Ids of removed vertices are only reused by add_vertex_id().
         """
-        u = []
-        if self.v_count == 0:
-            self.adj_matrix.append([0])
-        else:
-            for index in range(self.v_count):
-                self.adj_matrix[index].append(0)
-            for index in range(self.v_count + 1):
-                u.append(0)
-            self.adj_matrix.append(u)
-        self.v_count += 1
+        return self.add_vertices(1)
+
+    def add_vertices(self, n: int) -> int:
+        """
+        This method adds n new vertices to the graph in one step and returns the vertex count.
+        The new vertices get the ids v_count - n to v_count - 1.
+        """
+        if n > 0:
+            self._thaw()
+            self._store.add_vertices(n)
+            self._reverse = None
+            self.v_count += n
+            if self.cache is not None:
+                self.cache.vertices_added(n)
+            if self.index is not None:
+                self.index.vertices_added(n)
+            if self.journal is not None:
+                self.journal.record('add_vertices', n)
         return self.v_count
 
+    def add_vertex_id(self) -> int:
+        """
+        This method adds a new vertex and returns its id. The id of the most recently removed
+        vertex is reused if there is one, otherwise the vertex is appended like add_vertex().
+        """
+        if not self.free_ids:
+            return self.add_vertices(1) - 1
+        v = self.free_ids.pop()
+        self._removed.discard(v)
+        if self.journal is not None:
+            self.journal.record('add_vertex_id')
+        return v
+
+    def remove_vertex(self, v: int) -> None:
+        """
+        This method removes vertex v and every edge entering or leaving it. The id becomes a
+        tombstone: it is left out of get_vertices() and reused by the next add_vertex_id(), the
+        ids of the other vertices do not change. compact() drops the tombstones.
+        Finding the incoming edges is O(in-degree) with the index and O(V) without it.
+        """
+        if v < 0 or v >= self.v_count or v in self._removed:
+            return
+        self._thaw()
+        store = self._store
+        if self.index is not None:
+            incoming = list(self.index.preds[v])
+        elif isinstance(store, NumpyStorage):
+            incoming = np.flatnonzero(store.array[:, v]).tolist()
+        else:
+            incoming = [u for u in range(self.v_count) if store.get_weight(u, v)]
+        for src, dst in [(u, v) for u in incoming] + [(v, u) for u in store.successors(v)]:
+            if self.index is not None:
+                self.index.edge_changed(src, dst, store.get_weight(src, dst), 0)
+            store.set_weight(src, dst, 0)
+        self._reverse = None
+        if self.cache is not None:
+            self.cache.clear()
+        self._removed.add(v)
+        self.free_ids.append(v)
+        if self.journal is not None:
+            self.journal.record('remove_vertex', v)
+
+    def compact(self) -> dict:
+        """
+        This method renumbers the vertices 0, 1, 2, ... in their current order, dropping the
+        tombstones of removed vertices, and rebuilds the storage at its new size in one pass over
+        the edges. Returns a dict mapping the old id of every vertex to its new id.
+        """
+        mapping = dict()
+        for v in range(self.v_count):
+            if v not in self._removed:
+                mapping[v] = len(mapping)
+        if not self._removed:
+            return mapping
+
+        self._thaw()
+        store = STORAGES[self.storage]()
+        store.add_vertices(len(mapping))
+        store.set_weights((mapping[src], mapping[dst], weight)
+                          for src, dst, weight in self._store.edges())
+        self._store = store
+        self.v_count = len(mapping)
+        self.free_ids = []
+        self._removed = set()
+        self._reverse = None
+        if self.cache is not None:
+            self.cache.clear()
+        if self.index is not None:
+            self.index = ReverseIndex(store, self.v_count)
+        if self.journal is not None:
+            self.journal.record('compact')
+        return mapping
+
+    def add_edges_bulk(self, edges, rejected=None) -> None:
+        """
+        This method adds every (src, dst, weight) triple of an iterable, in order, with the same
+        rules as add_edge(). Self-loops, unknown or removed vertices and negative weights are
+        skipped and appended to the rejected list if one is given.
+        """
+        v_count = self.v_count
+        journal = self.journal
+        removed = self._removed
+
+        def valid_edges():
+            for edge in edges:
+                src, dst, weight = edge
+                if (src != dst and 0 <= src < v_count and 0 <= dst < v_count and weight >= 0
+                        and src not in removed and dst not in removed):
+                    if journal is not None:
+                        journal.record('add_edge', src, dst, weight)
+                    yield edge
+                elif rejected is not None:
+                    rejected.append(edge)
+
+        self._thaw()
+        self._store.set_weights(valid_edges())
+        self._reverse = None
+        if self.cache is not None:
+            self.cache.clear()
+        if self.index is not None:
+            self.index = ReverseIndex(self._store, self.v_count)
+
     def add_edge(self, src: int, dst: int, weight=1) -> None:
         """
         This method adds a new edge to the graph.
         """
-        if src == dst:
-            return
-        elif src > self.v_count - 1 or src < 0:
-            return
-        elif dst > self.v_count - 1 or dst < 0:
-            return
-        elif weight < 0:
-            return
+        if src == dst:
+            return
+        elif src > self.v_count - 1 or src < 0:
+            return
+        elif dst > self.v_count - 1 or dst < 0:
+            return
+        elif weight < 0:
+            return
+        elif src in self._removed or dst in self._removed:
+            return
+
+        self._set_edge(src, dst, weight)
+
+    def remove_edge(self, src: int, dst: int) -> None:
+        """
+        This method removes an edge between the two vertices with provided indices.
+        """
+        if src == dst:
+            return
+        elif src > self.v_count - 1 or src < 0:
+            return
+        elif dst > self.v_count - 1 or dst < 0:
+            return
+        elif self._store.get_weight(src, dst) == 0:
+            return
+        else:
+            self._set_edge(src, dst, 0)
+
+    def _set_edge(self, src: int, dst: int, weight) -> None:
+        """
+        This is a helper method that stores a validated edge weight and drops the data it makes stale.
+        """
+        old = self._store.get_weight(src, dst)
+        self._thaw()
+        self._store.set_weight(src, dst, weight)
+        self._reverse = None
+        # the storage may not keep the weight as given, e.g. BitsetStorage stores 1
+        new = self._store.get_weight(src, dst)
+        if self.cache is not None:
+            self.cache.edge_changed(src, dst, old, new)
+        if self.index is not None:
+            self.index.edge_changed(src, dst, old, new)
+        if self.journal is not None:
+            if weight:
+                self.journal.record('add_edge', src, dst, weight)
+            else:
+                self.journal.record('remove_edge', src, dst)
+
+    def _thaw(self) -> None:
+        """
+        This is a helper method that moves a read-only storage into SparseStorage before a change.
+        """
+        if self._store.readonly:
+            store = SparseStorage()
+            store.add_vertices(self.v_count)
+            store.set_weights(self._store.edges())
+            self._store = store
+            self.storage = 'sparse'
+
+    def save(self, path) -> None:
+        """
+        This method writes the graph to a compact binary file, see graph_io. The ids of removed
+        vertices are stored too, load() restores them as tombstones.
+        """
+        offsets = array('q', [0])
+        targets = array('i')
+        weights = []
+        for v in range(self.v_count):
+            for dst, weight in self._store.neighbors(v):
+                targets.append(dst)
+                weights.append(weight)
+            offsets.append(len(targets))
+        typecode = 'q' if all(isinstance(weight, int) for weight in weights) else 'd'
+        graph_io.write_csr(path, graph_io.DIRECTED, offsets, targets, array(typecode, weights),
+                           removed=array('q', self.free_ids))
+
+    @classmethod
+    def from_csv(cls, path, storage='sparse', delimiter=None, skip_header=False,
+                 chunk_size=65536, progress=None, malformed=None, rejected=None):
+        """
+        This method streams src,dst[,weight] rows from a CSV/TSV file into a new graph, one chunk
+        at a time, so memory stays bounded by the graph plus one chunk. A missing weight is 1.
+        Rows that cannot be parsed go to malformed, edges add_edge() would ignore go to rejected,
+        see graph_io.read_rows() for the other options.
+        """
+        def parse(fields):
+            if len(fields) == 2:
+                return int(fields[0]), int(fields[1]), 1
+            src, dst, weight = fields
+            try:
+                return int(src), int(dst), int(weight)
+            except ValueError:
+                return int(src), int(dst), float(weight)
+
+        graph = cls(storage=storage)
+        for chunk in graph_io.read_rows(path, parse, delimiter, skip_header, chunk_size,
+                                        progress, malformed):
+            top = max(max(map(itemgetter(0), chunk)), max(map(itemgetter(1), chunk)))
+            graph.add_vertices(top + 1 - graph.v_count)
+            graph.add_edges_bulk(chunk, rejected)
+        return graph
+
+    @classmethod
+    def load(cls, path):
+        """
+        This method memory-maps a file written by save() and returns a graph that reads its edges
+        straight from the mapping. The graph switches to the sparse storage when it is changed.
+        """
+        csr_file = graph_io.CSRFile(path)
+        if csr_file.kind != graph_io.DIRECTED:
+            raise ValueError(f"{path!s} does not hold a directed graph")
+        graph = cls()
+        graph._store = CSRStorage(csr_file)
+        graph.storage = 'csr'
+        graph.v_count = csr_file.v_count
+        graph.free_ids = csr_file.removed
+        graph._removed = set(csr_file.removed)
+        return graph
+
+    def enable_journal(self, path=None, sync=False) -> Journal:
+        """
+        This method starts recording every change in a Journal and returns it. With a path the
+        changes are also appended to that delta file, see graph_journal.Journal.
+        """
+        self.disable_journal()
+        self.journal = Journal(path, sync)
+        return self.journal
+
+    def disable_journal(self) -> None:
+        """
+        This method stops recording changes and closes the delta file.
+        """
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = None
+
+    def apply(self, mutations) -> int:
+        """
+        This method applies an iterable of (operation, *args) tuples such as ('add_edge', 0, 1, 5)
+        or ('add_vertices', 3) in one call and returns how many were applied. A missing add_edge
+        weight is 1, runs of add_edge go through add_edges_bulk().
+        """
+        return graph_journal.apply_mutations(
+            self, (m if m[0] != 'add_edge' or len(m) == 4 else (*m, 1) for m in mutations))
+
+    def replay(self, path, chunk_size=65536, malformed=None) -> int:
+        """
+        This method streams a delta file written by a journal onto the graph and returns the number
+        of mutations applied. Unparsable rows are skipped or appended to malformed.
+        """
+        def parse(fields):
+            operation, *args = fields
+            if operation == 'add_edge':
+                src, dst, weight = args if len(args) == 3 else (*args, '1')
+                try:
+                    return operation, int(src), int(dst), int(weight)
+                except ValueError:
+                    return operation, int(src), int(dst), float(weight)
+            arity = {'add_vertex': 0, 'add_vertices': 1, 'add_vertex_id': 0, 'remove_edge': 2,
+                     'remove_vertex': 1, 'compact': 0}
+            if arity.get(operation) != len(args):
+                raise ValueError(f"bad mutation {fields!r}")
+            return (operation, *map(int, args))
 
-        self.adj_matrix[src][dst] = weight
+        return graph_journal.replay(self, path, parse, chunk_size, malformed)
 
+    def checkpoint(self, path) -> None:
+        """
+        This method compacts the journal into a snapshot: the graph is saved to path atomically
+        and the journal is emptied. recover() rebuilds the graph from both.
+        """
+        graph_journal.checkpoint(self, path)
 
-    def remove_edge(self, src: int, dst: int) -> None:
+    @classmethod
+    def recover(cls, snapshot_path, journal_path, sync=False):
         """
-        This method removes an edge between the two vertices with provided indices.
+        This method loads the snapshot written by checkpoint() (an empty graph if there is none),
+        replays the delta file on top and keeps journaling to it.
         """
-        if src == dst:
-            return
-        elif src > self.v_count - 1 or src < 0:
-            return
-        elif dst > self.v_count - 1 or dst < 0:
-            return
-        elif self.adj_matrix[src][dst] == 0:
-            return
-        else:
-            self.adj_matrix[src][dst] = 0
+        return graph_journal.recover(cls, snapshot_path, journal_path, sync)
 
     def get_vertices(self) -> []:
         """
@@ -106,162 +1324,791 @@ class DirectedGraph:
         """
         vertices_list = []
         for index in range(self.v_count):
-            vertices_list.append(index)
+            if index not in self._removed:
+                vertices_list.append(index)
         return vertices_list
 
     def get_edges(self) -> []:
         """
         This method returns a list of edges in the graph.
         """
-        edges_list = []
-        for row in range(self.v_count):
-            for col in range(self.v_count):
-                if self.adj_matrix[row][col] != 0:
-                    edges_list.append((row, col, self.adj_matrix[row][col]))
-        return edges_list
+        return self._store.edges()
 
     def is_valid_path(self, path: []) -> bool:
         """
         This method takes a list of vertex indices and returns True if
         the sequence of vertices represents a valid path in the graph.
+        Every hop is an O(1) bounds check plus one edge lookup.
         """
-        if not path:
-            return True
+        return self._check_path(path)[0] == -1
+
+    def validate_paths(self, paths, weights=False):
+        """
+        This method validates many paths at once. For every path it returns the index of the
+        first vertex that is out of range or has no edge from the vertex before it, -1 if the
+        path is valid. With weights=True it returns (failures, totals) where totals holds the
+        summed edge weights of every valid path and None for invalid ones.
+        paths may also be a 2-D integer ndarray with one path per row, rows shorter than the
+        array end at their first -1. The check is then vectorized and the failures and totals
+        are returned as ndarrays, totals being nan for invalid paths.
+        """
+        if np is not None and isinstance(paths, np.ndarray):
+            failures, totals = self._validate_array(paths)
         else:
-            for index in range(len(path)):
-                if index not in self.get_vertices():
-                    return False
-                if index + 1 < len(path) and self.adj_matrix[path[index]][path[index + 1]] == 0:
-                    return False
-            return True
+            checked = [self._check_path(path) for path in paths]
+            failures = [failure for failure, _ in checked]
+            totals = [total for _, total in checked]
+        return (failures, totals) if weights else failures
 
-    def dfs(self, v_start, v_end=None) -> []:
+    def _check_path(self, path) -> (int, int):
         """
-        This method performs a depth-first search in the graph and returns a list of vertices
-        visited during the search, in the order they were visited.
+        This is a helper method that returns the index of the first invalid vertex of path
+        (-1 if there is none) and the total weight of the path (None if it is invalid).
         """
-        if v_start not in self.get_vertices():
-            return []
+        v_count = self.v_count
+        get_weight = self._store.get_weight
+        removed = self._removed
+        total = 0
+        prev = None
+        for index, v in enumerate(path):
+            if not 0 <= v < v_count or v in removed:
+                return index, None
+            if index:
+                weight = get_weight(prev, v)
+                if weight == 0:
+                    return index, None
+                total += weight
+            prev = v
+        return -1, total
 
-        visited = []
-        stack = [v_start]
+    def _validate_array(self, paths):
+        """
+        This is a helper method for validate_paths() on a 2-D ndarray of paths. Edges are
+        looked up in the numpy storage's matrix directly, other storages are turned into a
+        sorted array of src * V + dst keys searched with np.searchsorted().
+        """
+        paths = np.asarray(paths, dtype=np.int64)
+        if paths.ndim != 2:
+            raise ValueError("an ndarray of paths must have one path per row")
+        length = paths.shape[1]
+        if length == 0:
+            # rows of no vertices are empty paths, valid like [] in the list form
+            return np.full(len(paths), -1), np.zeros(len(paths))
+        padding = paths == -1
+        lengths = np.where(padding.any(axis=1), padding.argmax(axis=1), length)
+        inside = np.arange(length) < lengths[:, None]
+        in_range = (paths >= 0) & (paths < self.v_count)
+        if self._removed:
+            in_range &= ~np.isin(paths, list(self._removed))
+        bad = inside & ~in_range
 
-        while stack:
-            vertex = stack.pop()
+        hop = inside[:, 1:] & in_range[:, 1:] & in_range[:, :-1]
+        src = np.where(hop, paths[:, :-1], 0)
+        dst = np.where(hop, paths[:, 1:], 0)
+        if isinstance(self._store, NumpyStorage):
+            hop_weights = self._store.array[src, dst] if self.v_count else np.zeros(src.shape)
+        else:
+            # edges() lists edges in row-major order, so the keys are already sorted
+            edges = self._store.edges()
+            keys = np.array([u * self.v_count + v for u, v, _ in edges], dtype=np.int64)
+            weights = np.array([weight for _, _, weight in edges] + [0], dtype=np.float64)
+            wanted = src * self.v_count + dst
+            index = np.searchsorted(keys, wanted)
+            found = keys[np.minimum(index, len(keys) - 1)] == wanted if len(keys) else False
+            hop_weights = np.where(found, weights[index], 0)
+        hop_weights = np.where(hop, hop_weights, 0)
+        bad[:, 1:] |= hop & (hop_weights == 0)
 
-            if vertex not in visited:
-                visited.append(vertex)
-                if vertex == v_end:
-                    return visited
-                linked = []
-                for col in range(self.v_count):
-                    if self.adj_matrix[vertex][col] != 0:
-                        linked.append(col)
-                for v in sorted(linked, reverse=True):
-                    stack.append(v)
+        failed = bad.any(axis=1)
+        failures = np.where(failed, bad.argmax(axis=1), -1)
+        totals = np.where(failed, np.nan, hop_weights.sum(axis=1))
+        return failures, totals
 
-        return visited
+    def dfs(self, v_start, v_end=None) -> []:
+        """
+        This method performs a depth-first search in the graph and returns a list of vertices
+        visited during the search, in the order they were visited.
+        """
+        return list(self.iter_dfs(v_start, v_end))
 
     def bfs(self, v_start, v_end=None) -> []:
         """
         This method performs a breadth-first search in the graph and returns a list of vertices
         visited during the search, in the order they were visited.
         """
-        if v_start not in self.get_vertices():
-            return []
+        return list(self.iter_bfs(v_start, v_end))
+
+    def iter_dfs(self, v_start, v_end=None):
+        """
+        This method is a generator form of dfs(), it yields vertices one at a time in the order
+        they are visited. Lower-numbered neighbors are visited first. Runs in O(V + E) for the
+        sparse storage, O(V^2) for the dense one.
+        """
+        if v_start not in range(self.v_count) or v_start in self._removed:
+            return
+
+        successors = self._store.successors
+        call = self._begin('dfs')
+        if call is not None:
+            successors = call.expanding(successors)
+        visited = set()
+        stack = [v_start]
 
-        visited = []
-        queue = [v_start]
+        try:
+            while stack:
+                vertex = stack.pop()
 
-        while queue:
-            vertex = queue.pop(0)
-
-            if vertex not in visited:
-                visited.append(vertex)
-            if vertex == v_end:
-                return visited
-            linked = []
-            for col in range(self.v_count):
-                if self.adj_matrix[vertex][col] != 0:
-                    linked.append(col)
-            for v in sorted(linked):
-                if v not in visited:
-                    queue.append(v)
+                if vertex not in visited:
+                    visited.add(vertex)
+                    yield vertex
+                    if vertex == v_end:
+                        return
+                    stack.extend(v for v in reversed(successors(vertex)) if v not in visited)
+        finally:
+            if call is not None:
+                call.finish()
+
+    def iter_bfs(self, v_start, v_end=None):
+        """
+        This method is a generator form of bfs(), it yields vertices one at a time in the order
+        they are visited. Lower-numbered neighbors are visited first. Runs in O(V + E) for the
+        sparse storage, O(V^2) for the dense one.
+        """
+        if v_start not in range(self.v_count) or v_start in self._removed:
+            return
+
+        successors = self._store.successors
+        call = self._begin('bfs')
+        if call is not None:
+            successors = call.expanding(successors)
+        seen = {v_start}
+        queue = deque([v_start])
 
-        return visited
+        try:
+            while queue:
+                vertex = queue.popleft()
+                yield vertex
+                if vertex == v_end:
+                    return
+                for v in successors(vertex):
+                    if v not in seen:
+                        seen.add(v)
+                        queue.append(v)
+        finally:
+            if call is not None:
+                call.finish()
 
     def has_cycle(self):
         """
         This method returns True if there is at least one cycle in the graph, returns False otherwise.
         """
+        return drain(self._iter_has_cycle())
 
-        color = ["WHITE"] * self.v_count
-        for i in range(self.v_count):
-            if color[i] == "WHITE":
-                if self.dfs_helper(i, color):
-                    return True
-        return False
+    def topological_order(self) -> ([], []):
+        """
+        This method returns (order, None) where order lists every vertex before all vertices it
+        has an edge to, or (None, cycle) if the graph has a cycle, cycle being its vertices in
+        edge order.
+        """
+        call = self._begin('topological_order')
+        color = bytearray(self.v_count)
+        finished = []
+        try:
+            for i in self.get_vertices():
+                if color[i] == WHITE:
+                    cycle = self.dfs_helper(i, color, finished, call)
+                    if cycle:
+                        return None, cycle
+            finished.reverse()
+            return finished, None
+        finally:
+            if call is not None:
+                call.finish()
 
-    def dfs_helper(self, vertex, color):
+    def dfs_helper(self, vertex, color, finished=None, call=None):
         """
         This is a helper method using colors to define whether a vertex has been visited and in a cycle.
+        It explores everything reachable from vertex with an explicit stack, so deep graphs do not hit
+        the recursion limit. Vertices are GRAY while on the stack and BLACK once finished, finished
+        vertices are appended to finished if given. Returns the vertices of the first cycle found,
+        None if there is none. call is the CallStats of the calling method when stats are enabled.
         """
-        vertex_list = self.get_vertices()
-        color[vertex] = "GRAY"
-        linked = []
-        for col in range(self.v_count):
-            if self.adj_matrix[vertex][col] != 0:
-                linked.append(col)
-        if not linked:
-            color[vertex] = "BLACK"
-            return False
-        else:
-            for v in linked:
-                if color[v] == "GRAY":
-                    return True
-                if color[v] == "WHITE" and self.dfs_helper(v, color):
-                    return True
+        return drain(self._iter_dfs_helper(vertex, color, finished, call))
+
+    def _iter_dfs_helper(self, vertex, color, finished=None, call=None):
+        """
+        This is a helper method, the generator form of dfs_helper() that yields once per step of
+        the explicit stack and returns what dfs_helper() returns.
+        """
+        successors = self._store.successors
+        color[vertex] = GRAY
+        path = [vertex]
+        if call is not None:
+            successors = call.expanding(successors, path)
+        stack = [iter(successors(vertex))]
+        while stack:
+            for v in stack[-1]:
+                if color[v] == GRAY:
+                    return path[path.index(v):]
+                if color[v] == WHITE:
+                    color[v] = GRAY
+                    path.append(v)
+                    stack.append(iter(successors(v)))
+                    break
+            else:
+                stack.pop()
+                done = path.pop()
+                color[done] = BLACK
+                if finished is not None:
+                    finished.append(done)
+            yield
+        return None
 
-        color[vertex] = "BLACK"
-        return False
+    def _iter_has_cycle(self):
+        """
+        This is a helper method, the generator form of has_cycle() that yields once per step of
+        the search and returns the result. has_cycle() and async_has_cycle() both run it.
+        """
+        call = self._begin('has_cycle')
+        color = bytearray(self.v_count)
+        try:
+            for i in self.get_vertices():
+                if color[i] == WHITE and (yield from self._iter_dfs_helper(i, color, call=call)):
+                    return True
+            return False
+        finally:
+            if call is not None:
+                call.finish()
 
     def dijkstra(self, src: int) -> []:
         """
         This method implements the Dijkstra algorithm to compute the length of the shortest path from
         a given vertex to all other vertices in the graph.
         """
-        visited = {}
+        return self.dijkstra_tree(src)[0]
+
+    def dijkstra_tree(self, src: int, dst=None) -> ([], []):
+        """
+        This method computes the shortest path tree rooted at src and returns a list of distances
+        and a list of predecessors (None for src and unreachable vertices).
+        The heap is ordered by distance and every vertex is settled at most once, stale heap
+        entries are skipped when popped. If dst is given the search stops as soon as dst is
+        settled, only dst and the vertices settled before it then have final distances.
+        """
+        return drain(self._iter_dijkstra_tree(src, dst))
+
+    def iter_dijkstra(self, src: int):
+        """
+        This method is a generator form of dijkstra(), it yields (vertex, distance) pairs in the
+        order the vertices are settled. Vertices that are never yielded are unreachable. It uses
+        the cache and stats like dijkstra(), a cached tree is yielded in order of distance.
+        """
+        yield from self._iter_dijkstra_tree(src, replay=True)
+
+    def _iter_dijkstra_tree(self, src: int, dst=None, replay=False):
+        """
+        This is a helper method, the generator form of dijkstra_tree() that yields (vertex, distance)
+        once per vertex settled and returns (dist, pred). A tree found in the cache is returned
+        without yielding, unless replay is True.
+        """
+        call = self._begin('dijkstra')
+        try:
+            inf = float('inf')
+            if self.cache is not None:
+                entry = self.cache.get(src)
+                if entry is not None:
+                    dist, pred = list(entry[0]), list(entry[1])
+                    if replay:
+                        for d, v in sorted((d, v) for v, d in enumerate(dist) if d != inf):
+                            yield v, d
+                    return dist, pred
+
+            dist = [inf] * self.v_count
+            pred = [None] * self.v_count
+            if src < 0 or src >= self.v_count or src in self._removed:
+                return dist, pred
+
+            neighbors = self._store.neighbors
+            push, pop = heapq.heappush, heapq.heappop
+            if call is not None:
+                neighbors, push, pop = call.expanding(neighbors), call.heappush, call.heappop
+            dist[src] = 0
+            heap = []
+            push(heap, (0, src))
+            while heap:
+                d, v = pop(heap)
+                if d > dist[v]:
+                    continue
+                yield v, d
+                if v == dst:
+                    break
+                for u, weight in neighbors(v):
+                    new_dist = d + weight
+                    if new_dist < dist[u]:
+                        dist[u] = new_dist
+                        pred[u] = v
+                        push(heap, (new_dist, u))
+
+            if self.cache is not None and dst is None:
+                self.cache.put(src, list(dist), list(pred))
+            return dist, pred
+        finally:
+            if call is not None:
+                call.edges_relaxed = max(0, call.heap_pushes - 1)
+                call.finish()
+
+    async def async_dfs(self, v_start, v_end=None, yield_every=1000, timeout=None, offload=False,
+                        executor=None) -> []:
+        """
+        This method is an asyncio form of dfs() that gives control back to the event loop every
+        yield_every vertices. It can be cancelled, raises TimeoutError after timeout seconds and
+        runs in executor with offload=True, see graph_async.run_steps().
+        """
+        return await run_steps(collecting(self.iter_dfs(v_start, v_end)),
+                               yield_every, timeout, offload, executor)
+
+    async def async_bfs(self, v_start, v_end=None, yield_every=1000, timeout=None, offload=False,
+                        executor=None) -> []:
+        """
+        This method is an asyncio form of bfs(), see async_dfs().
+        """
+        return await run_steps(collecting(self.iter_bfs(v_start, v_end)),
+                               yield_every, timeout, offload, executor)
+
+    async def async_dijkstra(self, src: int, yield_every=1000, timeout=None, offload=False,
+                             executor=None) -> []:
+        """
+        This method is an asyncio form of dijkstra(), see async_dfs().
+        """
+        def steps():
+            dist, _ = yield from self._iter_dijkstra_tree(src)
+            return dist
+
+        return await run_steps(steps(), yield_every, timeout, offload, executor)
+
+    async def async_has_cycle(self, yield_every=1000, timeout=None, offload=False,
+                              executor=None) -> bool:
+        """
+        This method is an asyncio form of has_cycle(), see async_dfs().
+        """
+        return await run_steps(self._iter_has_cycle(), yield_every, timeout, offload, executor)
+
+    def enable_cache(self, max_bytes=64 * 2 ** 20) -> ShortestPathCache:
+        """
+        This method turns on caching of dijkstra() / dijkstra_tree() results per source vertex and
+        returns the cache, whose stats() report hits and misses.
+        """
+        self.cache = ShortestPathCache(max_bytes)
+        return self.cache
+
+    def disable_cache(self) -> None:
+        """
+        This method turns off and drops the shortest path cache.
+        """
+        self.cache = None
+
+    def enable_stats(self, callback=None) -> OperationStats:
+        """
+        This method turns on per-call counters for dfs, bfs, has_cycle, topological_order,
+        dijkstra and shortest_path and returns the collector. callback(call_stats) is invoked
+        after every instrumented call.
+        """
+        self.stats = OperationStats(callback)
+        return self.stats
+
+    def disable_stats(self) -> None:
+        """
+        This method turns off the per-call counters.
+        """
+        self.stats = None
+
+    def _begin(self, operation: str):
+        """
+        This is a helper method that starts the counters of one call, None if stats are disabled.
+        Matrix-backed storages scan a full row of v_count cells per expanded vertex.
+        """
+        if self.stats is None:
+            return None
+        return self.stats.begin(operation, self.v_count if self._store.row_scan else 0)
+
+    def enable_index(self) -> ReverseIndex:
+        """
+        This method builds a reverse adjacency index with in/out-degree counters in O(V + E),
+        keeps it up to date on every change and returns it. predecessors(), in_degree(),
+        out_degree(), reverse_neighbors() and bidirectional shortest_path() then use it.
+        """
+        self.index = ReverseIndex(self._store, self.v_count)
+        return self.index
+
+    def disable_index(self) -> None:
+        """
+        This method drops the reverse adjacency index.
+        """
+        self.index = None
+
+    def predecessors(self, v: int) -> []:
+        """
+        This method returns the vertices with an edge into v in ascending order,
+        O(in-degree) with the index, an empty list if v is not in the graph.
+        """
+        if v < 0 or v >= self.v_count:
+            return []
+        return [src for src, _ in self.reverse_neighbors(v)]
+
+    def successors(self, v: int) -> []:
+        """
+        This method returns the vertices v has an edge to in ascending order,
+        an empty list if v is not in the graph.
+        """
+        if v < 0 or v >= self.v_count:
+            return []
+        return self._store.successors(v)
+
+    def in_degree(self, v: int) -> int:
+        """
+        This method returns the number of edges entering v, O(1) with the index.
+        """
+        if v < 0 or v >= self.v_count:
+            return 0
+        if self.index is not None:
+            return self.index.in_degree[v]
+        return len(self.reverse_neighbors(v))
+
+    def out_degree(self, v: int) -> int:
+        """
+        This method returns the number of edges leaving v, O(1) with the index.
+        """
+        if v < 0 or v >= self.v_count:
+            return 0
+        if self.index is not None:
+            return self.index.out_degree[v]
+        return len(self._store.successors(v))
+
+    def reverse_neighbors(self, v: int) -> []:
+        """
+        This method returns (src, weight) pairs of the edges entering v, in ascending src order.
+        With the index enabled this is O(in-degree), otherwise the reverse adjacency is built
+        once in O(V + E) and reused until the graph changes.
+        """
+        if self.index is not None:
+            return self.index.reverse_neighbors(v)
+        if self._reverse is None:
+            reverse = [[] for _ in range(self.v_count)]
+            for src, dst, weight in self._store.edges():
+                reverse[dst].append((src, weight))
+            self._reverse = reverse
+        return self._reverse[v]
+
+    def shortest_path(self, src: int, dst: int, method='bidirectional', heuristic=None) -> (int, []):
+        """
+        This method returns the length of the shortest path from src to dst and the path itself,
+        (inf, []) if dst cannot be reached.
+        - method 'dijkstra' runs dijkstra_tree() with early exit
+        - method 'bidirectional' grows one search from src and one from dst over reverse_neighbors()
+        - method 'astar' uses heuristic(v), an admissible (never overestimating) lower bound
+          on the distance from v to dst
+        """
+        inf = float('inf')
+        if src < 0 or src >= self.v_count or dst < 0 or dst >= self.v_count:
+            return inf, []
+        if src in self._removed or dst in self._removed:
+            return inf, []
+        if method == 'dijkstra':
+            dist, pred = self.dijkstra_tree(src, dst)
+            if dist[dst] == inf:
+                return inf, []
+            return dist[dst], self.build_path(pred, dst)
+        elif method == 'bidirectional':
+            return self._bidirectional_search(src, dst)
+        elif method == 'astar':
+            if heuristic is None:
+                raise ValueError("method 'astar' requires a heuristic")
+            return self._astar_search(src, dst, heuristic)
+        raise ValueError(f"unknown method {method!r}, expected 'dijkstra', 'bidirectional' or 'astar'")
+
+    def _bidirectional_search(self, src, dst):
+        """
+        This is a helper method for bidirectional Dijkstra. The side with the smaller heap is
+        expanded next and the search stops once the two heap minimums add up to at least the
+        best meeting distance found so far.
+        """
+        inf = float('inf')
+        if src == dst:
+            return 0, [src]
+        expand = (self._store.neighbors, self.reverse_neighbors)
+        push, pop = heapq.heappush, heapq.heappop
+        call = self._begin('shortest_path')
+        if call is not None:
+            expand = tuple(call.expanding(neighbors) for neighbors in expand)
+            push, pop = call.heappush, call.heappop
+        dist = ({src: 0}, {dst: 0})
+        pred = ({src: None}, {dst: None})
+        heaps = ([], [])
+        push(heaps[0], (0, src))
+        push(heaps[1], (0, dst))
+        best, meet = inf, None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            d, v = pop(heaps[side])
+            if d > dist[side][v]:
+                continue
+            this, other = dist[side], dist[1 - side]
+            for u, weight in expand[side](v):
+                new_dist = d + weight
+                if new_dist < this.get(u, inf):
+                    this[u] = new_dist
+                    pred[side][u] = v
+                    push(heaps[side], (new_dist, u))
+                    if u in other and new_dist + other[u] < best:
+                        best, meet = new_dist + other[u], u
+
+        if call is not None:
+            call.edges_relaxed = call.heap_pushes - 2
+            call.finish()
+        if meet is None:
+            return inf, []
+        path = self.build_path(pred[0], meet)
+        v = pred[1][meet]
+        while v is not None:
+            path.append(v)
+            v = pred[1][v]
+        return best, path
+
+    def _astar_search(self, src, dst, heuristic):
+        """
+        This is a helper method for A* search. The heap is ordered by distance plus heuristic,
+        a vertex is expanded again only if a shorter distance to it is found later.
+        """
+        inf = float('inf')
+        neighbors = self._store.neighbors
+        push, pop = heapq.heappush, heapq.heappop
+        call = self._begin('shortest_path')
+        if call is not None:
+            neighbors, push, pop = call.expanding(neighbors), call.heappush, call.heappop
+        dist = {src: 0}
+        pred = {src: None}
         heap = []
-        heapq.heappush(heap, (src, 0))
-        while heap:
-            v, dist = heapq.heappop(heap)
-            if v in visited.keys() and dist < visited[v]:
-                visited[v] = dist
-                linked = []
-                for col in range(self.v_count):
-                    if self.adj_matrix[v][col] != 0:
-                        linked.append((col, self.adj_matrix[v][col]))
-
-                for vertex, dist2 in linked:
-                    heapq.heappush(heap, (vertex, dist + dist2))
-            if v not in visited.keys():
-                visited[v] = dist
-                linked = []
-                for col in range(self.v_count):
-                    if self.adj_matrix[v][col] != 0:
-                        linked.append((col, self.adj_matrix[v][col]))
-
-                for vertex, dist2 in linked:
-                    heapq.heappush(heap, (vertex, dist + dist2))
-
-        output = []
-        for index in range(self.v_count):
-            if index not in visited.keys():
-                output.append(float('inf'))
+        push(heap, (heuristic(src), 0, src))
+        try:
+            while heap:
+                _, d, v = pop(heap)
+                if d > dist[v]:
+                    continue
+                if v == dst:
+                    return d, self.build_path(pred, dst)
+                for u, weight in neighbors(v):
+                    new_dist = d + weight
+                    if new_dist < dist.get(u, inf):
+                        dist[u] = new_dist
+                        pred[u] = v
+                        push(heap, (new_dist + heuristic(u), new_dist, u))
+            return inf, []
+        finally:
+            if call is not None:
+                call.edges_relaxed = call.heap_pushes - 1
+                call.finish()
+
+    def to_numpy(self):
+        """
+        This method returns the adjacency matrix as a float64 ndarray, 0 meaning no edge.
+        For the numpy storage this is a view of the graph's own array, not a copy.
+        """
+        if np is None:
+            raise ImportError("to_numpy() requires numpy")
+        if isinstance(self._store, NumpyStorage):
+            return self._store.array
+        matrix = np.zeros((self.v_count, self.v_count))
+        edges = self._store.edges()
+        if edges:
+            src, dst, weight = (np.asarray(column) for column in zip(*edges))
+            matrix[src, dst] = weight
+        return matrix
+
+    def degree_vectors(self):
+        """
+        This method returns two int ndarrays, the in-degree and out-degree of every vertex.
+        """
+        if self.index is not None and np is not None:
+            return np.array(self.index.in_degree), np.array(self.index.out_degree)
+        mask = self.to_numpy() != 0
+        return mask.sum(axis=0), mask.sum(axis=1)
+
+    def floyd_warshall(self):
+        """
+        This method returns a V x V ndarray of shortest path lengths between all pairs of vertices,
+        inf where there is no path. Each of the V rounds relaxes the whole matrix at once.
+        """
+        matrix = self.to_numpy()
+        dist = np.where(matrix != 0, matrix, np.inf)
+        np.fill_diagonal(dist, 0)
+        for k in range(self.v_count):
+            np.minimum(dist, dist[:, k, None] + dist[None, k, :], out=dist)
+        return dist
+
+    def transitive_closure(self):
+        """
+        This method returns a V x V boolean ndarray, True at [u][v] if v can be reached from u
+        (every vertex reaches itself). The reachability matrix is squared until it stops
+        changing, which takes O(log V) matrix products.
+        """
+        reach = (self.to_numpy() != 0).astype(np.float32)
+        np.fill_diagonal(reach, 1)
+        while True:
+            step = (reach @ reach > 0).astype(np.float32)
+            if np.array_equal(step, reach):
+                return reach > 0
+            reach = step
+
+    def bfs_distances(self, src: int) -> []:
+        """
+        This method returns the number of edges on the shortest path from src to every vertex,
+        inf for unreachable vertices.
+        """
+        dist = [float('inf')] * self.v_count
+        if src not in range(self.v_count):
+            return dist
+        successors = self._store.successors
+        dist[src] = 0
+        queue = deque([src])
+        while queue:
+            vertex = queue.popleft()
+            hops = dist[vertex] + 1
+            for v in successors(vertex):
+                if hops < dist[v]:
+                    dist[v] = hops
+                    queue.append(v)
+        return dist
+
+    def dijkstra_many(self, sources, workers=None):
+        """
+        This method runs dijkstra() from every vertex in sources and returns the distances as a
+        len(sources) x V memoryview of doubles, result[i, v] being the distance from sources[i] to v.
+        np.asarray(result) wraps it without copying. With no sources the view is empty.
+        Sources are split across workers processes (default: one per CPU). The workers are forked,
+        so they share the graph copy-on-write, and write their rows straight into a shared buffer.
+        """
+        return self._run_many('dijkstra', sources, workers)
+
+    def bfs_many(self, sources, workers=None):
+        """
+        This method is dijkstra_many() for bfs_distances(), edge counts instead of weights.
+        """
+        return self._run_many('bfs_distances', sources, workers)
+
+    def _run_many(self, method, sources, workers):
+        """
+        This is a helper method that fans a single-source search out over forked worker processes.
+        Without fork support, or with a single worker, the sources run in this process.
+        """
+        global _shared_graph, _shared_out
+        sources = list(sources)
+        v_count = self.v_count
+        if not sources or not v_count:
+            return memoryview(array('d'))
+        buffer = mmap.mmap(-1, max(8, len(sources) * v_count * 8))
+        out = memoryview(buffer).cast('d')
+        workers = min(workers or os.cpu_count() or 1, len(sources))
+        chunk = -(-len(sources) // (4 * workers))
+        tasks = [(method, first, sources[first:first + chunk])
+                 for first in range(0, len(sources), chunk)]
+
+        _shared_graph, _shared_out = self, out
+        try:
+            if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('fork')
+                with ProcessPoolExecutor(workers, mp_context=context) as executor:
+                    for _ in executor.map(_many_worker, tasks):
+                        pass
             else:
-                output.append(visited[index])
+                for task in tasks:
+                    _many_worker(task)
+        finally:
+            _shared_graph, _shared_out = None, None
+
+        return out[:len(sources) * v_count].cast('B').cast('d', (len(sources), v_count))
+
+    def storage_bytes(self) -> int:
+        """
+        This method returns the memory used by the edge storage in bytes, as measured by
+        sys.getsizeof() on its containers.
+        """
+        return self._store.nbytes()
+
+    @staticmethod
+    def build_path(pred: [], dst: int) -> []:
+        """
+        This method follows a predecessor list back from dst and returns the path ending at dst.
+        """
+        path = [dst]
+        while pred[path[-1]] is not None:
+            path.append(pred[path[-1]])
+        path.reverse()
+        return path
+
+
+class DirectedSubgraph(DirectedGraph):
+    """
+    Read-only view of the subgraph of a DirectedGraph induced by a set of its vertices
+    - nothing is copied, the edges are filtered from the graph's storage when they are read
+    - vertex ids are those of the graph, ids outside the view behave like removed vertices
+    - every read method works on the view, changing it raises TypeError, see materialize()
+    - the graph must not change while the view is in use, take views of a copy() or
+      Snapshot of a graph that is being written to
+    """
+
+    __slots__ = ('graph', 'vertices')
+
+    def __init__(self, graph, vertices):
+        """
+        Store the graph and the vertex set, a view of a view filters the underlying graph directly
+        """
+        if isinstance(graph, DirectedSubgraph):
+            vertices = [v for v in vertices if v in graph.vertices]
+            graph = graph.graph
+        super().__init__()
+        self.graph = graph
+        self.vertices = frozenset(v for v in vertices
+                                  if 0 <= v < graph.v_count and v not in graph._removed)
+        self.v_count = graph.v_count
+        self.storage = 'subgraph'
+        self._store = SubgraphStorage(graph._store, self.vertices, graph.v_count)
+        self._removed = Complement(self.vertices, graph.v_count)
+
+    def _thaw(self) -> None:
+        """
+        This method refuses every change, a view is read-only.
+        """
+        raise TypeError("subgraph view is read-only, materialize() returns a standalone copy")
+
+    def get_vertices(self) -> []:
+        """
+        This method returns the vertices of the view in ascending order.
+        """
+        return sorted(self.vertices)
+
+    def materialize(self) -> (DirectedGraph, dict):
+        """
+        This method returns the view as a standalone DirectedGraph with the storage of the
+        underlying graph ('sparse' for a graph returned by load()), together with a dict mapping
+        the id of every vertex of the view to its id in the new graph like compact() does. The
+        vertices are renumbered 0, 1, 2, ... in the order of get_vertices().
+        """
+        storage = self.graph.storage if self.graph.storage in STORAGES else 'sparse'
+        mapping = {v: i for i, v in enumerate(self.get_vertices())}
+        graph = DirectedGraph.from_edges(((mapping[src], mapping[dst], weight)
+                                          for src, dst, weight in self._store.edges()),
+                                         len(mapping), storage)
+        return graph, mapping
 
-        return output
+    def copy(self):
+        """
+        This method returns an independent copy of the view with renumbered vertices, the graph
+        materialize() returns, which also returns the mapping of the ids.
+        """
+        return self.materialize()[0]
 
 
 if __name__ == '__main__':
@@ -348,3 +2195,145 @@ if __name__ == '__main__':
     print('\n', g)
     for i in range(5):
         print(f'DIJKSTRA {i} {g.dijkstra(i)}')
+
+
+    print("\nsparse storage example")
+    print("----------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges, storage='sparse')
+    print(g.get_edges(), g.dfs(0), g.bfs(0), g.dijkstra(0), sep='\n')
+
+
+    print("\ndijkstra_tree() / build_path() example")
+    print("---------------------------------------")
+    edges = [(0, 1, 13), (2, 5, 19), (2, 6, 2), (2, 10, 16), (3, 0, 16), (3, 9, 3), (5, 0, 1),
+            (6, 3, 11), (7, 5, 14), (7, 8, 19), (9, 5, 2), (10, 9, 14), (11, 2, 7), (12, 6, 9)]
+    g = DirectedGraph(edges)
+    dist, pred = g.dijkstra_tree(2, 1)
+    print(dist[1], g.build_path(pred, 1))
+
+
+    print("\nshortest_path() example")
+    print("-----------------------")
+    for method in ('dijkstra', 'bidirectional', 'astar'):
+        print(method, g.shortest_path(2, 1, method, heuristic=lambda v: 0))
+
+
+    print("\ntopological_order() example")
+    print("---------------------------")
+    edges = [(1, 3, 2), (1, 11, 11), (3, 5, 9), (3, 6, 4), (4, 2, 14), (4, 10, 8), (5, 0, 12),
+             (5, 7, 8), (7, 4, 3), (8, 11, 20), (11, 4, 10), (12, 11, 1)]
+    g = DirectedGraph(edges)
+    print(g.topological_order())
+    g.add_edge(10, 1)
+    print(g.topological_order())
+
+
+    print("\nenable_cache() example")
+    print("----------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    cache = g.enable_cache()
+    for src in (0, 1, 0, 1):
+        g.dijkstra(src)
+    g.add_edge(2, 3, 30)
+    g.remove_edge(4, 3)
+    print(g.dijkstra(0), g.dijkstra(1), cache.stats(), sep='\n')
+
+
+    print("\nstorage_bytes() example")
+    print("-----------------------")
+    edges = [(src, (src * 7 + 3) % 500, 1) for src in range(500)]
+    edges += [(src, (src * 13 + 5) % 500, 1) for src in range(500)]
+    for storage in sorted(STORAGES):
+        g = DirectedGraph(edges, storage=storage)
+        print('{:<8}'.format(storage), g.storage_bytes())
+
+
+    print("\nenable_stats() example")
+    print("----------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    for storage in ('dense', 'sparse'):
+        g = DirectedGraph(edges, storage=storage)
+        stats = g.enable_stats()
+        g.dijkstra(0)
+        g.has_cycle()
+        for operation, totals in stats.summary().items():
+            totals.pop('seconds')
+            print(storage, operation, totals)
+
+
+    print("\nvalidate_paths() example")
+    print("------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    paths = [[0, 1, 4, 3], [1, 3, 2, 1], [0, 4], [4, 0, 7], [10], []]
+    print(g.validate_paths(paths, weights=True))
+    if np is not None:
+        print(*g.validate_paths(np.array([[0, 1, 4, 3], [1, 3, 2, 1], [4, 0, -1, -1]]), weights=True))
+
+
+    print("\nenable_index() example")
+    print("----------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    g.enable_index()
+    g.add_edge(0, 3, 2)
+    g.remove_edge(2, 1)
+    for v in g.get_vertices():
+        print(v, g.predecessors(v), g.successors(v), g.in_degree(v), g.out_degree(v))
+
+
+    print("\nasync_dijkstra() example")
+    print("------------------------")
+    import asyncio
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    print(asyncio.run(g.async_dijkstra(0, yield_every=2)), asyncio.run(g.async_has_cycle()))
+    print(asyncio.run(g.async_bfs(4, offload=True)))
+
+
+    print("\nenable_journal() example")
+    print("------------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    journal = g.enable_journal()
+    g.add_vertex()
+    g.add_edge(5, 0, 4)
+    g.remove_edge(2, 1)
+    print(journal.entries)
+    h = DirectedGraph(edges)
+    h.apply(journal.entries)
+    print(h.get_edges() == g.get_edges())
+
+
+    print("\nremove_vertex() example")
+    print("-----------------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    g.remove_vertex(1)
+    print(g.get_vertices(), g.get_edges(), g.dijkstra(4))
+    print(g.add_vertex_id(), g.get_vertices())
+    g.remove_vertex(1)
+    print(g.add_vertex(), g.get_vertices())
+    print(g.compact(), g.get_edges())
+
+
+    print("\nk_hop() example")
+    print("---------------")
+    edges = [(0, 1, 10), (4, 0, 12), (1, 4, 15), (4, 3, 3),
+             (3, 1, 5), (2, 1, 23), (3, 2, 7)]
+    g = DirectedGraph(edges)
+    view = g.k_hop(4, 1)
+    print(view.get_vertices(), view.get_edges())
+    print(view.dfs(4), view.dijkstra(4), view.has_cycle())
+    h, mapping = g.subgraph([0, 1, 4], materialize=True)
+    print(mapping, h.get_edges())
@@ -0,0 +1,86 @@
+# Course: CS261 - Data Structures
+# Author: Lok Wai Wong
+# Assignment: 6
+# Description: Cooperative asyncio driver for the graph traversal generators
+
+import asyncio
+import threading
+import time
+
+
+def collecting(items):
+    """
+    Generator that steps through items and returns them as a list
+    """
+    result = []
+    for item in items:
+        result.append(item)
+        yield
+    return result
+
+
+def drain(steps):
+    """
+    Run generator steps to completion at once and return its return value
+    Used by the synchronous methods, which share their generator with the asyncio forms
+    """
+    try:
+        while True:
+            next(steps)
+    except StopIteration as stop:
+        return stop.value
+
+
+def _advance(steps, n: int, deadline):
+    """
+    Run up to n steps, return (True, result) once steps is exhausted, (False, None) otherwise
+    Raise TimeoutError if the deadline (time.monotonic() value) has passed
+    """
+    for _ in range(n):
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return True, stop.value
+    if deadline is not None and time.monotonic() > deadline:
+        raise TimeoutError("graph operation exceeded its timeout")
+    return False, None
+
+
+async def run_steps(steps, yield_every=1000, timeout=None, offload=False, executor=None):
+    """
+    Drive generator steps to completion without blocking the event loop and return its return value
+    - by default control goes back to the event loop after every yield_every steps, cancelling
+      the awaiting task stops the work there
+    - with offload=True the steps run in executor (the loop's default thread pool if None), the
+      worker checks for cancellation and the timeout every yield_every steps
+    - timeout is in seconds, TimeoutError is raised once it is exceeded
+    The graph must not be changed while the steps run, hand a Snapshot to run against a graph
+    that is being written to
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        if not offload:
+            while True:
+                done, result = _advance(steps, yield_every, deadline)
+                if done:
+                    return result
+                await asyncio.sleep(0)
+
+        cancelled = threading.Event()
+
+        def work():
+            while not cancelled.is_set():
+                done, result = _advance(steps, yield_every, deadline)
+                if done:
+                    return result
+            return None
+
+        future = asyncio.get_running_loop().run_in_executor(executor, work)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    finally:
+        if not offload:
+            steps.close()
@@ -0,0 +1,261 @@
+# Course: CS261 - Data Structures
+# Author: Lok Wai Wong
+# Assignment: 6
+# Description: Copy-on-write snapshots for sharing a graph between threads
+
+import threading
+from contextlib import contextmanager
+
+# method name prefixes that change a graph, refused by Snapshot
+MUTATORS = ('add_', 'remove_', 'enable_', 'disable_', 'compact', 'apply', 'replay')
+
+
+class Snapshot:
+    """
+    Immutable view of one version of a graph
+    - every read method of the graph is available, e.g. snapshot.dijkstra(0)
+    - methods that would change the graph raise TypeError
+    - a snapshot never changes, readers can keep it as long as they need a consistent view
+    """
+
+    __slots__ = ('_graph', 'version')
+
+    def __init__(self, graph, version: int):
+        self._graph = graph
+        self.version = version
+
+    def __getattr__(self, name):
+        if name.startswith(MUTATORS):
+            raise TypeError(f"snapshot of version {self.version} is read-only, {name}() not allowed")
+        return getattr(self._graph, name)
+
+    def __str__(self):
+        return str(self._graph)
+
+
+class VersionedGraph:
+    """
+    Thread-safe wrapper that serializes writers and hands readers copy-on-write snapshots
+    - writers change the private working graph in place, every write() block or forwarded
+      mutator produces one new version
+    - snapshot() returns the Snapshot of the latest version, the first reader after a write
+      publishes the working graph itself as that version, which is O(1) under the lock
+    - the next writer copies the published graph outside the lock and continues on the copy,
+      so the O(V + E) copy is paid by writers, at most once per version readers have seen
+    - readers never wait for each other or for a copy, only for the changes of a running
+      write() block, and writers never wait for readers
+    - the cache, stats and journal of the graph stay with the working graph, snapshots have none
+    The VersionedGraph owns the graph it is given, change it through write() only.
+    """
+
+    __slots__ = ('_graph', '_lock', '_write_lock', '_version', '_snapshot', '_shared', '_detached')
+
+    # attributes only the writer may use, they are moved off a graph before it is published
+    WRITER_STATE = ('cache', 'stats', 'journal')
+
+    def __init__(self, graph):
+        self._graph = graph
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._version = 0
+        self._snapshot = None
+        self._shared = False
+        self._detached = dict()
+
+    @property
+    def version(self) -> int:
+        """
+        Number of writes applied so far
+        """
+        return self._version
+
+    def snapshot(self) -> Snapshot:
+        """
+        Return an immutable view of the latest version
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != self._version:
+                graph = self._graph
+                graph.settle()
+                for name in self.WRITER_STATE:
+                    if hasattr(graph, name):
+                        self._detached[name] = getattr(graph, name)
+                        setattr(graph, name, None)
+                self._shared = True
+                self._snapshot = Snapshot(graph, self._version)
+            return self._snapshot
+
+    def _private_copy(self):
+        """
+        Return a copy of the published graph carrying the writer state moved off it
+        """
+        graph = self._graph.copy()
+        for name, value in self._detached.items():
+            setattr(graph, name, value)
+        self._detached.clear()
+        return graph
+
+    @contextmanager
+    def write(self):
+        """
+        Yield the working graph to one writer at a time, all changes made in the block
+        become visible to readers together as one new version
+        """
+        with self._write_lock:
+            # only readers set _shared and only while a write is pending, so once it is seen
+            # set it stays set until this writer clears it, and the published graph can be
+            # copied without blocking readers
+            graph = self._private_copy() if self._shared else None
+            with self._lock:
+                if graph is None and self._shared:
+                    graph = self._private_copy()
+                if graph is not None:
+                    self._graph = graph
+                    self._shared = False
+                try:
+                    yield self._graph
+                finally:
+                    self._version += 1
+
+    def _apply(self, method: str, *args):
+        with self.write() as graph:
+            return getattr(graph, method)(*args)
+
+    def add_vertex(self, *args):
+        return self._apply('add_vertex', *args)
+
+    def add_edge(self, *args) -> None:
+        self._apply('add_edge', *args)
+
+    def add_edges_bulk(self, *args) -> None:
+        self._apply('add_edges_bulk', *args)
+
+    def remove_edge(self, *args) -> None:
+        self._apply('remove_edge', *args)
+
+    def remove_vertex(self, *args) -> None:
+        self._apply('remove_vertex', *args)
+
+    def apply(self, mutations) -> int:
+        return self._apply('apply', mutations)
+
+
+if __name__ == '__main__':
+
+    import random
+    import sys
+    import time
+
+    from d_graph import DirectedGraph
+    from ud_graph import UndirectedGraph
+
+    print("\nsnapshot() example")
+    print("------------------")
+    shared = VersionedGraph(UndirectedGraph(['AB', 'BC', 'CD']))
+    before = shared.snapshot()
+    shared.remove_vertex('B')
+    after = shared.snapshot()
+    print(before.version, before.get_edges(), before.dfs('A'))
+    print(after.version, after.get_edges(), after.dfs('A'))
+    try:
+        after.add_edge('A', 'D')
+    except TypeError as error:
+        print(error)
+
+    print("\nstress test")
+    print("-----------")
+    # every write moves one edge (and its weight) somewhere else, so a consistent view always
+    # has the same number of edges and the same total weight, and undirected edges are symmetric
+    # the graphs are large and all threads start together, so several readers make the first
+    # reads of every new snapshot at the same time, errors counts exceptions raised by readers
+    def stress(make, check, move, readers: int, seconds=1.0) -> (int, int, int, int):
+        shared = VersionedGraph(make())
+        start = threading.Barrier(readers + 1)
+        stop = threading.Event()
+        counts = [0] * readers
+        torn = []
+        errors = []
+
+        def writer():
+            rnd = random.Random(0)
+            start.wait()
+            while not stop.is_set():
+                with shared.write() as graph:
+                    move(graph, rnd)
+
+        def reader(k):
+            last = -1
+            start.wait()
+            while not stop.is_set():
+                snapshot = shared.snapshot()
+                try:
+                    if snapshot.version < last or not check(snapshot):
+                        torn.append(snapshot.version)
+                except Exception as error:
+                    errors.append(error)
+                last = snapshot.version
+                counts[k] += 1
+
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader, args=(k,)) for k in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return sum(counts), shared.version, len(torn), len(errors)
+
+    n = 20000
+    directed_edges = [(v, (v * step + 1) % n, 1 + v % 9) for step in (7, 13) for v in range(n)]
+    directed_count = len(DirectedGraph.from_edges(directed_edges, n, 'sparse').get_edges())
+    directed_weight = sum(w for _, _, w in DirectedGraph.from_edges(directed_edges, n).get_edges())
+
+    def check_directed(snapshot):
+        snapshot.bfs(0)
+        edges = snapshot.get_edges()
+        return len(edges) == directed_count and sum(w for _, _, w in edges) == directed_weight
+
+    def move_directed(graph, rnd):
+        src = rnd.randrange(n)
+        neighbors = graph._store.neighbors(src)
+        u, v = rnd.sample(range(n), 2)
+        if neighbors and not graph.is_valid_path([u, v]):
+            dst, weight = rnd.choice(neighbors)
+            graph.remove_edge(src, dst)
+            graph.add_edge(u, v, weight)
+
+    undirected_edges = [(f'v{v}', f'v{(v * 7 + 1) % n}') for v in range(n)]
+    undirected_count = len(UndirectedGraph(undirected_edges).get_edges())
+    names = sorted(UndirectedGraph(undirected_edges).adj_list)
+
+    def check_undirected(snapshot):
+        adj_list = snapshot.adj_list
+        snapshot.bfs('v0')
+        return (len(snapshot.get_edges()) == undirected_count
+                and all(u in adj_list[v] for u in adj_list for v in adj_list[u]))
+
+    def move_undirected(graph, rnd):
+        u = rnd.choice(names)
+        a, b = rnd.sample(names, 2)
+        if u in graph.adj_list and graph.adj_list[u] and b not in graph.adj_list.get(a, ()):
+            v = rnd.choice(list(graph.adj_list[u]))
+            graph.remove_edge(u, v)
+            graph.add_edge(a, b)
+
+    failed = False
+    for name, make, check, move in (
+            ('directed', lambda: DirectedGraph.from_edges(directed_edges, n, 'sparse'),
+             check_directed, move_directed),
+            ('undirected', lambda: UndirectedGraph(undirected_edges),
+             check_undirected, move_undirected)):
+        for readers in (2, 4, 8):
+            reads, versions, torn, errors = stress(make, check, move, readers)
+            print(f'{name:<10} readers={readers} reads={reads} versions={versions} torn={torn} '
+                  f'errors={errors}')
+            failed = failed or torn > 0 or errors > 0
+    if failed:
+        sys.exit("stress test failed: readers saw torn versions or raised errors")
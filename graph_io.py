@@ -0,0 +1,187 @@
+# Course: CS261 - Data Structures
+# Author: Lok Wai Wong
+# Assignment: 6
+# Description: Compact binary graph file format shared by DirectedGraph and UndirectedGraph
+
+import csv
+import io
+import mmap
+import struct
+import sys
+from array import array
+
+# File layout, every section starts on an 8 byte boundary:
+#   header         magic, version, kind, weight typecode, byte order, checkpoint generation,
+#                  vertex/target counts and the label byte count of undirected graphs or the
+#                  removed id count of directed ones
+#   offsets        int64 x (V + 1), neighbors of vertex v are targets[offsets[v]:offsets[v + 1]]
+#   targets        int32 x offsets[V]
+#   weights        int64 or float64 x offsets[V], absent for unweighted graphs
+#   label offsets  int64 x (V + 1), absent for unlabelled graphs
+#   labels         UTF-8 bytes, label of vertex v is labels[label_offsets[v]:label_offsets[v + 1]]
+#   removed        int64 ids of removed vertices in the order they are reused, directed graphs only
+MAGIC = b'CSRG'
+VERSION = 1
+DIRECTED, UNDIRECTED = 0, 1
+HEADER = struct.Struct('<4sHBcc3xIQQQ')
+
+
+def _padding(size: int) -> bytes:
+    """
+    Return the zero bytes needed to move size up to a multiple of 8
+    """
+    return bytes(-size % 8)
+
+
+def write_csr(path, kind: int, offsets: array, targets: array, weights=None, labels=None,
+              removed=None) -> None:
+    """
+    Write a graph in compressed sparse row form
+    offsets is an array('q'), targets an array('i'), weights an array('q') or array('d')
+    labels is a list of vertex names (str) or None
+    removed is an array('q') of removed vertex ids or None, only written for directed graphs
+    """
+    typecode = weights.typecode.encode() if weights is not None else b'-'
+    byteorder = b'<' if sys.byteorder == 'little' else b'>'
+    label_offsets = array('q', [0])
+    blob = bytearray()
+    if labels is not None:
+        for label in labels:
+            blob += label.encode('utf-8')
+            label_offsets.append(len(blob))
+    if kind != DIRECTED or removed is None:
+        removed = array('q')
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, kind, typecode, byteorder, 0,
+                               len(offsets) - 1, len(targets), len(blob) or len(removed)))
+        sections = [offsets, targets]
+        if weights is not None:
+            sections.append(weights)
+        if labels is not None:
+            sections += [label_offsets, blob]
+        if removed:
+            sections.append(removed)
+        for section in sections:
+            data = section.tobytes() if isinstance(section, array) else bytes(section)
+            file.write(data)
+            file.write(_padding(len(data)))
+
+
+def read_generation(path) -> int:
+    """
+    Return the checkpoint generation stored in the header of a graph file, 0 if none was set
+    """
+    with open(path, 'rb') as file:
+        fields = HEADER.unpack(file.read(HEADER.size))
+    if fields[0] != MAGIC or fields[1] != VERSION:
+        raise ValueError(f"{path!s} is not a version {VERSION} graph file")
+    return fields[5]
+
+
+def write_generation(path, generation: int) -> None:
+    """
+    Store the checkpoint generation in the header of a graph file written by write_csr()
+    """
+    with open(path, 'r+b') as file:
+        fields = list(HEADER.unpack(file.read(HEADER.size)))
+        fields[5] = generation
+        file.seek(0)
+        file.write(HEADER.pack(*fields))
+
+
+class CSRFile:
+    """
+    Graph file mapped into memory
+    - offsets, targets and weights are memoryviews over the mapping, nothing is copied
+    - labels is a list of str for labelled graphs, None otherwise
+    - removed lists the removed vertex ids of a directed graph, in the order they are reused
+    - generation is the checkpoint generation of the file, see graph_journal.checkpoint()
+    - the mapping stays open as long as the CSRFile or one of its views is referenced
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.kind, typecode, byteorder, self.generation,
+         v_count, n_targets, n_extra) = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path!s} is not a version {VERSION} graph file")
+        if byteorder != (b'<' if sys.byteorder == 'little' else b'>'):
+            raise ValueError(f"{path!s} was written on a machine with a different byte order")
+
+        self.v_count = v_count
+        self.weight_type = None if typecode == b'-' else typecode.decode()
+        view = memoryview(self.mmap)
+        position = HEADER.size
+
+        def section(fmt, count):
+            nonlocal position
+            size = count * struct.calcsize(fmt)
+            data = view[position:position + size]
+            position += size + (-size % 8)
+            return data.cast(fmt) if fmt != 'B' else data
+
+        self.offsets = section('q', v_count + 1)
+        self.targets = section('i', n_targets)
+        self.weights = section(self.weight_type, n_targets) if self.weight_type else None
+        self.labels = None
+        self.removed = []
+        if self.kind == UNDIRECTED:
+            label_offsets = section('q', v_count + 1)
+            blob = section('B', n_extra)
+            self.labels = [str(blob[label_offsets[i]:label_offsets[i + 1]], 'utf-8')
+                           for i in range(v_count)]
+        elif n_extra:
+            self.removed = section('q', n_extra).tolist()
+
+
+def read_rows(path, parse, delimiter=None, skip_header=False, chunk_size=65536,
+              progress=None, malformed=None):
+    """
+    Stream a delimited text file as lists of at most chunk_size parsed rows
+    parse turns a list of fields into a tuple and raises ValueError or IndexError on a bad row
+    Bad rows are skipped, or appended to malformed as (line number, fields) if it is a list
+    progress(rows, bytes) is called after every chunk if given
+    The delimiter defaults to a tab for .tsv files and a comma otherwise, blank lines and
+    lines starting with # are ignored
+    Lines are split with str.split(), the csv module is only used for lines with quotes
+    """
+    if delimiter is None:
+        delimiter = '\t' if str(path).endswith('.tsv') else ','
+    with open(path, 'rb') as raw:
+        file = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        line_num = 0
+        rows = 0
+        chunk = []
+        while True:
+            lines = file.readlines(1 << 20)
+            if not lines:
+                break
+            for line in lines:
+                line_num += 1
+                if skip_header and line_num == 1:
+                    continue
+                line = line.rstrip('\r\n')
+                if not line or line.startswith('#'):
+                    continue
+                if '"' in line:
+                    fields = next(csv.reader([line], delimiter=delimiter))
+                else:
+                    fields = line.split(delimiter)
+                try:
+                    chunk.append(parse(fields))
+                except (ValueError, IndexError):
+                    if malformed is not None:
+                        malformed.append((line_num, fields))
+                if len(chunk) == chunk_size:
+                    rows += len(chunk)
+                    yield chunk
+                    chunk = []
+                    if progress is not None:
+                        progress(rows, raw.tell())
+        if chunk:
+            rows += len(chunk)
+            yield chunk
+        if progress is not None:
+            progress(rows, raw.tell())
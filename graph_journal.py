@@ -0,0 +1,180 @@
+# Course: CS261 - Data Structures
+# Author: Lok Wai Wong
+# Assignment: 6
+# Description: Mutation journal and delta replay shared by DirectedGraph and UndirectedGraph
+
+import csv
+import os
+
+import graph_io
+
+# mutations a journal records and apply_mutations() accepts, as (operation, *args) tuples
+OPERATIONS = ('add_vertex', 'add_vertices', 'add_vertex_id', 'add_edge', 'remove_edge',
+              'remove_vertex', 'compact')
+
+
+class Journal:
+    """
+    Append-only log of the mutations applied to a graph
+    - entries holds the (operation, *args) tuples recorded since the last checkpoint
+    - with a path every entry is also appended to that delta file, one row per mutation, in the
+      format replay() reads (tab separated for .tsv files, comma separated otherwise)
+    - sync=True flushes the file after every entry, otherwise call flush()
+    - generation is the checkpoint generation of the snapshot the entries apply to, a delta file
+      starts with a "# checkpoint <generation>" line that replay() skips as a comment
+    """
+
+    __slots__ = ('entries', 'path', 'sync', 'generation', '_file', '_writer')
+
+    def __init__(self, path=None, sync=False):
+        self.entries = []
+        self.path = path
+        self.sync = sync
+        self.generation = 0
+        self._file = None
+        self._writer = None
+        if path is not None:
+            self._file = open(path, 'a', encoding='utf-8', newline='')
+            delimiter = '\t' if str(path).endswith('.tsv') else ','
+            self._writer = csv.writer(self._file, delimiter=delimiter, lineterminator='\n')
+            if self._file.tell() == 0:
+                self._write_generation()
+            else:
+                self.generation = read_generation(path)
+
+    def _write_generation(self) -> None:
+        """
+        Start the delta file with the generation line
+        """
+        self._file.write(f'# checkpoint {self.generation}\n')
+        self._file.flush()
+
+    def record(self, *entry) -> None:
+        """
+        Append one (operation, *args) entry
+        """
+        self.entries.append(entry)
+        if self._writer is not None:
+            self._writer.writerow(entry)
+            if self.sync:
+                self._file.flush()
+
+    def flush(self, fsync=False) -> None:
+        """
+        Push buffered entries to the delta file, and to the disk with fsync=True
+        """
+        if self._file is not None:
+            self._file.flush()
+            if fsync:
+                os.fsync(self._file.fileno())
+
+    def truncate(self, generation=None) -> None:
+        """
+        Forget every entry, called once they are part of the snapshot of the given generation
+        """
+        self.entries.clear()
+        if generation is not None:
+            self.generation = generation
+        if self._file is not None:
+            self._file.flush()
+            self._file.truncate(0)
+            self._write_generation()
+
+    def close(self) -> None:
+        """
+        Flush and close the delta file
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+def read_generation(path) -> int:
+    """
+    Return the checkpoint generation a delta file starts from, 0 for a file without one
+    """
+    with open(path, encoding='utf-8') as file:
+        fields = file.readline().split()
+    return int(fields[2]) if fields[:2] == ['#', 'checkpoint'] and len(fields) == 3 else 0
+
+
+def apply_mutations(graph, mutations) -> int:
+    """
+    Apply (operation, *args) tuples to graph in order and return how many were applied
+    Runs of add_edge are handed to add_edges_bulk() in one call, which applies the same rules
+    """
+    count = 0
+    edges = []
+    for operation, *args in mutations:
+        count += 1
+        if operation == 'add_edge':
+            edges.append(args)
+            continue
+        if edges:
+            graph.add_edges_bulk(edges)
+            edges = []
+        method = getattr(graph, operation, None) if operation in OPERATIONS else None
+        if method is None:
+            raise ValueError(f"{type(graph).__name__} does not support mutation {operation!r}")
+        method(*args)
+    if edges:
+        graph.add_edges_bulk(edges)
+    return count
+
+
+def replay(graph, path, parse, chunk_size=65536, malformed=None) -> int:
+    """
+    Stream a delta file written by a Journal onto graph and return the number of mutations applied
+    parse turns the fields of one row into an (operation, *args) tuple
+    Rows that cannot be parsed go to malformed, see graph_io.read_rows()
+    """
+    count = 0
+    for chunk in graph_io.read_rows(path, parse, chunk_size=chunk_size, malformed=malformed):
+        count += apply_mutations(graph, chunk)
+    return count
+
+
+def checkpoint(graph, path) -> None:
+    """
+    Save graph to path atomically as the next checkpoint generation, then empty its journal
+    The snapshot and the delta file both carry the generation, so a crash between replacing the
+    snapshot and emptying the journal leaves a delta file recover() knows to be already applied
+    """
+    generation = graph_io.read_generation(path) if os.path.exists(path) else 0
+    if graph.journal is not None:
+        generation = max(generation, graph.journal.generation)
+    generation += 1
+    temp = f'{path}.tmp'
+    graph.save(temp)
+    graph_io.write_generation(temp, generation)
+    os.replace(temp, path)
+    if graph.journal is not None:
+        graph.journal.truncate(generation)
+
+
+def recover(cls, snapshot_path, journal_path, sync=False, **kwargs):
+    """
+    Return a graph of class cls loaded from the snapshot (empty if there is none) with the
+    journal replayed on top, journaling to journal_path from then on
+    A delta file of an older generation than the snapshot is already part of it and is emptied
+    instead, one of a newer generation belongs to a snapshot that is missing and raises ValueError
+    kwargs are passed on to cls.load() or cls()
+    """
+    generation = 0
+    if os.path.exists(snapshot_path):
+        generation = graph_io.read_generation(snapshot_path)
+        graph = cls.load(snapshot_path, **kwargs)
+    else:
+        graph = cls(**kwargs)
+    if os.path.exists(journal_path):
+        delta_generation = read_generation(journal_path)
+        if delta_generation > generation:
+            raise ValueError(f"{journal_path!s} continues checkpoint {delta_generation}, "
+                             f"{snapshot_path!s} is checkpoint {generation}")
+        if delta_generation == generation:
+            graph.replay(journal_path)
+    journal = graph.enable_journal(journal_path, sync)
+    if journal.generation != generation:
+        journal.truncate(generation)
+    return graph
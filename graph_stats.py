@@ -0,0 +1,129 @@
+# Course: CS261 - Data Structures
+# Author: Lok Wai Wong
+# Assignment: 6
+# Description: Operation counters shared by DirectedGraph and UndirectedGraph
+
+import heapq
+import time
+
+
+class CallStats:
+    """
+    Counters of one instrumented graph operation
+    - heap_pushes, heap_pops: priority queue traffic
+    - vertices_settled: vertices whose neighbors were expanded
+    - edges_scanned: edges looked at while expanding, edges_relaxed: those that lowered a distance
+    - cells_scanned: adjacency matrix cells read by the matrix-backed DirectedGraph storages
+    - max_depth: deepest DFS path reached by DirectedGraph.dfs_helper()
+    - seconds: wall time, for generators it includes the time spent by the consumer
+    """
+
+    FIELDS = ('seconds', 'heap_pushes', 'heap_pops', 'vertices_settled', 'edges_scanned',
+              'edges_relaxed', 'cells_scanned', 'max_depth')
+
+    __slots__ = ('operation', 'collector', 'row_cells', 'start') + FIELDS
+
+    def __init__(self, operation: str, collector, row_cells=0):
+        self.operation = operation
+        self.collector = collector
+        self.row_cells = row_cells
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+        self.start = time.perf_counter()
+
+    def heappush(self, heap: [], item) -> None:
+        """
+        Counting heapq.heappush()
+        """
+        self.heap_pushes += 1
+        heapq.heappush(heap, item)
+
+    def heappop(self, heap: []):
+        """
+        Counting heapq.heappop()
+        """
+        self.heap_pops += 1
+        return heapq.heappop(heap)
+
+    def expanding(self, neighbors, path=None):
+        """
+        Return neighbors wrapped to count settled vertices, scanned edges and matrix cells
+        If path is a list its largest length is recorded as max_depth
+        """
+        def counted(v):
+            result = neighbors(v)
+            self.vertices_settled += 1
+            self.edges_scanned += len(result)
+            self.cells_scanned += self.row_cells
+            if path is not None and len(path) > self.max_depth:
+                self.max_depth = len(path)
+            return result
+        return counted
+
+    def finish(self) -> None:
+        """
+        Stop the clock and hand the counters to the collector
+        """
+        self.seconds = time.perf_counter() - self.start
+        self.collector.record(self)
+
+    def as_dict(self) -> dict:
+        """
+        Return the operation name and counters as a dict
+        """
+        counters = {field: getattr(self, field) for field in self.FIELDS}
+        counters['operation'] = self.operation
+        return counters
+
+
+class OperationStats:
+    """
+    Collector of per-call counters, returned by enable_stats() of both graph classes
+    - last is the CallStats of the most recent call
+    - summary() adds up the counters per operation, max_depth is the largest seen
+    - callback(call_stats) is invoked after every call, e.g. to export it to a metrics pipeline
+    Nothing is counted while stats are disabled, the graph then only checks for None once per call.
+    """
+
+    __slots__ = ('callback', 'last', 'totals')
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.last = None
+        self.totals = dict()
+
+    def begin(self, operation: str, row_cells=0) -> CallStats:
+        """
+        Start counting one call of operation
+        """
+        return CallStats(operation, self, row_cells)
+
+    def record(self, call: CallStats) -> None:
+        """
+        Add the counters of a finished call to the totals
+        """
+        self.last = call
+        totals = self.totals.get(call.operation)
+        if totals is None:
+            totals = self.totals[call.operation] = dict.fromkeys(('calls',) + CallStats.FIELDS, 0)
+        totals['calls'] += 1
+        for field in CallStats.FIELDS:
+            if field == 'max_depth':
+                totals[field] = max(totals[field], call.max_depth)
+            else:
+                totals[field] += getattr(call, field)
+        if self.callback is not None:
+            self.callback(call)
+
+    def summary(self) -> dict:
+        """
+        Return {operation: totals} for every operation called so far
+        """
+        return {operation: dict(totals) for operation, totals in self.totals.items()}
+
+    def reset(self) -> None:
+        """
+        Forget all counters
+        """
+        self.last = None
+        self.totals.clear()
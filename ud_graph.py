@@ -3,7 +3,101 @@
 # Assignment: 6
 # Description: Implementing undirected graphs
 
+import sys
+from array import array
 from collections import deque
+from collections.abc import Mapping
+
+import graph_io
+import graph_journal
+from graph_async import collecting, drain, run_steps
+from graph_journal import Journal
+from graph_stats import OperationStats
+
+
+class DisjointSet:
+    """
+    Union-find over hashable items
+    - path compression and union by rank
+    - near-constant amortized find() and union()
+    """
+
+    __slots__ = ('parent', 'rank', 'count')
+
+    def __init__(self, items=()):
+        self.parent = {item: item for item in items}
+        self.rank = dict.fromkeys(self.parent, 0)
+        self.count = len(self.parent)
+
+    def add(self, item) -> None:
+        """
+        Add item as a new singleton set
+        """
+        if item not in self.parent:
+            self.parent[item] = item
+            self.rank[item] = 0
+            self.count += 1
+
+    def find(self, item):
+        """
+        Return the representative of the set containing item
+        """
+        parent = self.parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, a, b) -> bool:
+        """
+        Merge the sets containing a and b, return False if they were already one set
+        """
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        if self.rank[root_a] < self.rank[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        if self.rank[root_a] == self.rank[root_b]:
+            self.rank[root_a] += 1
+        self.count -= 1
+        return True
+
+
+class NeighborSet(dict):
+    """
+    Insertion-ordered set of neighbors
+    - O(1) add, remove and membership test
+    - iterates and prints like the list it replaces
+    """
+
+    __slots__ = ()
+
+    def add(self, v) -> None:
+        """
+        Add v, keeping the position of an existing v
+        """
+        self[v] = None
+
+    def discard(self, v) -> None:
+        """
+        Remove v if present
+        """
+        self.pop(v, None)
+
+    append = add
+
+    def remove(self, v) -> None:
+        """
+        Remove v, raise KeyError if not present
+        """
+        del self[v]
+
+    def __repr__(self):
+        return repr(list(self))
+
 
 class UndirectedGraph:
     """
@@ -12,20 +106,39 @@ class UndirectedGraph:
     - loops not allowed
     - no edge weights
     - vertex names are strings
+    - neighbors of each vertex are kept in a NeighborSet
+    - subgraph() and k_hop() return zero-copy UndirectedSubgraph views
     """
 
-    def __init__(self, start_edges=None):
+    __slots__ = ('adj_list', 'incremental', '_edge_count', '_sorted', '_components',
+                 '_component_ids', 'stats', 'journal')
+
+    def __init__(self, start_edges=None, incremental=False):
         """
         Store graph info as adjacency list
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        With incremental=True the connected components are kept up to date on every change
         """
         self.adj_list = dict()
+        self.incremental = incremental
+        self._edge_count = 0
+        self._sorted = dict()
+        self._components = DisjointSet() if incremental else None
+        self._component_ids = None
+        self.stats = None
+        self.journal = None
 
         # populate graph with initial vertices and edges (if provided)
-        # before using, implement add_vertex() and add_edge() methods
         if start_edges is not None:
-            for u, v in start_edges:
-                self.add_edge(u, v)
+            self.add_edges_bulk(start_edges)
+
+    @classmethod
+    def from_edges(cls, edges, incremental=False, rejected=None):
+        """
+        Build graph from an iterable of (u, v) pairs in a single pass
+        """
+        graph = cls(incremental=incremental)
+        graph.add_edges_bulk(edges, rejected)
+        return graph
 
     def __str__(self):
         """
@@ -47,36 +160,85 @@ class UndirectedGraph:
         """
         if v in self.adj_list.keys():
             return
-        self.adj_list[v] = []
-        
+        self.adj_list[v] = NeighborSet()
+        if self.incremental:
+            self._components.add(v)
+        if self.journal is not None:
+            self.journal.record('add_vertex', v)
+        self._touch()
+
+    def add_vertices(self, vertices) -> None:
+        """
+        Add every vertex of an iterable, existing vertices are skipped
+        """
+        adj_list = self.adj_list
+        components = self._components if self.incremental else None
+        journal = self.journal
+        for v in vertices:
+            if v not in adj_list:
+                adj_list[v] = NeighborSet()
+                if components is not None:
+                    components.add(v)
+                if journal is not None:
+                    journal.record('add_vertex', v)
+        self._touch()
+
+    def add_edges_bulk(self, edges, rejected=None) -> None:
+        """
+        Add every (u, v) pair of an iterable with the same rules as add_edge()
+        Duplicates are skipped, self-loops are skipped and appended to rejected if given
+        """
+        adj_list = self.adj_list
+        components = self._components if self.incremental else None
+        journal = self.journal
+        added = 0
+        for edge in edges:
+            u, v = edge
+            if u == v:
+                if rejected is not None:
+                    rejected.append(edge)
+                continue
+            u_neighbors = adj_list.get(u)
+            if u_neighbors is None:
+                u_neighbors = adj_list[u] = NeighborSet()
+                if components is not None:
+                    components.add(u)
+            elif v in u_neighbors:
+                continue
+            v_neighbors = adj_list.get(v)
+            if v_neighbors is None:
+                v_neighbors = adj_list[v] = NeighborSet()
+                if components is not None:
+                    components.add(v)
+            u_neighbors[v] = None
+            v_neighbors[u] = None
+            added += 1
+            if components is not None:
+                components.union(u, v)
+            if journal is not None:
+                journal.record('add_edge', u, v)
+        self._edge_count += added
+        self._sorted.clear()
+        self._touch()
+
     def add_edge(self, u: str, v: str) -> None:
         """
         Add edge to the graph
         """
         if u == v:
             return
-        elif v not in self.adj_list.keys() and u not in self.adj_list.keys():
-            self.add_vertex(u)
-            self.adj_list[u].append(v)
-            self.add_vertex(v)
-            self.adj_list[v].append(u)
-        elif u not in self.adj_list.keys():
-            self.add_vertex(u)
-            self.adj_list[u].append(v)
-            if v in self.adj_list.keys():
-                self.adj_list[v].append(u)
-        elif v not in self.adj_list.keys():
-            self.add_vertex(v)
-            self.adj_list[v].append(u)
-            if u in self.adj_list.keys():
-                self.adj_list[u].append(v)
-        elif v in self.adj_list[u]:
-            return
-        elif u in self.adj_list[v]:
+        elif u in self.adj_list.keys() and v in self.adj_list[u]:
             return
-        else:
-            self.adj_list[v].append(u)
-            self.adj_list[u].append(v)
+        self.add_vertex(u)
+        self.add_vertex(v)
+        self.adj_list[u].add(v)
+        self.adj_list[v].add(u)
+        self._edge_count += 1
+        if self.incremental:
+            self._components.union(u, v)
+        if self.journal is not None:
+            self.journal.record('add_edge', u, v)
+        self._touch(u, v)
 
     def remove_edge(self, v: str, u: str) -> None:
         """
@@ -91,8 +253,14 @@ class UndirectedGraph:
         elif v not in self.adj_list[u]:
             return
         else:
-            self.adj_list[v].remove(u)
-            self.adj_list[u].remove(v)
+            self.adj_list[v].discard(u)
+            self.adj_list[u].discard(v)
+            self._edge_count -= 1
+            if self.incremental and not self._reaches(u, v):
+                self._components.count += self._split_component([u, v]) - 1
+            if self.journal is not None:
+                self.journal.record('remove_edge', v, u)
+            self._touch(u, v)
 
     def remove_vertex(self, v: str) -> None:
         """
@@ -101,10 +269,181 @@ class UndirectedGraph:
         if v not in self.adj_list.keys():
             return
         else:
-            self.adj_list.pop(v)
-            for lists in self.adj_list:
-                if v in self.adj_list[lists]:
-                    self.adj_list[lists].remove(v)
+            neighbors = self.adj_list.pop(v)
+            self._edge_count -= len(neighbors)
+            for u in neighbors:
+                self.adj_list[u].discard(v)
+            if self.incremental:
+                self._components.parent.pop(v)
+                self._components.rank.pop(v)
+                self._components.count += self._split_component(neighbors) - 1
+            if self.journal is not None:
+                self.journal.record('remove_vertex', v)
+            self._touch(v, *neighbors)
+
+    def _touch(self, *vertices) -> None:
+        """
+        Drop cached data made stale by a change to the edges of vertices
+        """
+        for v in vertices:
+            self._sorted.pop(v, None)
+        if not self.incremental:
+            self._components = None
+        self._component_ids = None
+
+    def _reaches(self, u: str, v: str) -> bool:
+        """
+        Return True if there is a path between u and v
+        Grows one BFS from each end, one vertex at a time, and stops when they meet
+        or when either side runs out of vertices
+        """
+        seen = ({u}, {v})
+        queues = (deque([u]), deque([v]))
+        while queues[0] and queues[1]:
+            for side in (0, 1):
+                vertex = queues[side].popleft()
+                for w in self.adj_list[vertex]:
+                    if w in seen[1 - side]:
+                        return True
+                    if w not in seen[side]:
+                        seen[side].add(w)
+                        queues[side].append(w)
+        return False
+
+    def _split_component(self, seeds) -> int:
+        """
+        Rebuild the union-find entries of the component that contained seeds before a removal
+        Every piece reachable from a seed gets the seed as its new root
+        Return the number of pieces, the caller updates the component count
+        """
+        components = self._components
+        pieces = 0
+        done = set()
+        for seed in seeds:
+            if seed in done:
+                continue
+            pieces += 1
+            done.add(seed)
+            components.parent[seed] = seed
+            components.rank[seed] = 0
+            queue = deque([seed])
+            while queue:
+                vertex = queue.popleft()
+                for w in self.adj_list[vertex]:
+                    if w not in done:
+                        done.add(w)
+                        components.parent[w] = seed
+                        components.rank[w] = 0
+                        components.rank[seed] = 1
+                        queue.append(w)
+        return pieces
+
+    def save(self, path) -> None:
+        """
+        Write graph to a compact binary file with a vertex name table, see graph_io
+        """
+        ids = {v: i for i, v in enumerate(self.adj_list)}
+        offsets = array('q', [0])
+        targets = array('i')
+        for v in self.adj_list:
+            targets.extend(ids[u] for u in self.adj_list[v])
+            offsets.append(len(targets))
+        graph_io.write_csr(path, graph_io.UNDIRECTED, offsets, targets, labels=list(ids))
+
+    @classmethod
+    def from_csv(cls, path, incremental=False, delimiter=None, skip_header=False,
+                 chunk_size=65536, progress=None, malformed=None, rejected=None):
+        """
+        Stream u,v rows from a CSV/TSV file into a new graph, one chunk at a time
+        Vertex names are interned so every occurrence shares one string
+        Rows without exactly two fields go to malformed, self-loops go to rejected,
+        see graph_io.read_rows() for the other options
+        """
+        intern = sys.intern
+
+        def parse(fields):
+            u, v = fields
+            return intern(u), intern(v)
+
+        graph = cls(incremental=incremental)
+        for chunk in graph_io.read_rows(path, parse, delimiter, skip_header, chunk_size,
+                                        progress, malformed):
+            graph.add_edges_bulk(chunk, rejected)
+        return graph
+
+    @classmethod
+    def load(cls, path, incremental=False):
+        """
+        Read graph from a file written by save()
+        The file is memory-mapped and adj_list is decoded straight from the mapped arrays
+        """
+        csr_file = graph_io.CSRFile(path)
+        if csr_file.kind != graph_io.UNDIRECTED:
+            raise ValueError(f"{path!s} does not hold an undirected graph")
+        labels, offsets, targets = csr_file.labels, csr_file.offsets, csr_file.targets
+        graph = cls(incremental=incremental)
+        for i, v in enumerate(labels):
+            graph.adj_list[v] = NeighborSet.fromkeys(
+                [labels[u] for u in targets[offsets[i]:offsets[i + 1]].tolist()])
+        graph._edge_count = len(targets) // 2
+        if incremental:
+            graph._components = None
+            graph._connectivity()
+        return graph
+
+    def enable_journal(self, path=None, sync=False) -> Journal:
+        """
+        Start recording every change in a Journal and return it
+        With a path the changes are also appended to that delta file, see graph_journal.Journal
+        """
+        self.disable_journal()
+        self.journal = Journal(path, sync)
+        return self.journal
+
+    def disable_journal(self) -> None:
+        """
+        Stop recording changes and close the delta file
+        """
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = None
+
+    def apply(self, mutations) -> int:
+        """
+        Apply an iterable of (operation, *args) tuples such as ('add_edge', 'A', 'B') in one call
+        Return how many were applied, runs of add_edge go through add_edges_bulk()
+        """
+        return graph_journal.apply_mutations(self, mutations)
+
+    def replay(self, path, chunk_size=65536, malformed=None) -> int:
+        """
+        Stream a delta file written by a journal onto the graph, return number of mutations applied
+        Rows that cannot be parsed are skipped or appended to malformed
+        """
+        intern = sys.intern
+        arity = {'add_vertex': 1, 'add_edge': 2, 'remove_edge': 2, 'remove_vertex': 1}
+
+        def parse(fields):
+            operation, *args = fields
+            if arity.get(operation) != len(args):
+                raise ValueError(f"bad mutation {fields!r}")
+            return (operation, *map(intern, args))
+
+        return graph_journal.replay(self, path, parse, chunk_size, malformed)
+
+    def checkpoint(self, path) -> None:
+        """
+        Save graph to path atomically and empty the journal, recover() rebuilds the graph from both
+        """
+        graph_journal.checkpoint(self, path)
+
+    @classmethod
+    def recover(cls, snapshot_path, journal_path, sync=False, incremental=False):
+        """
+        Load the snapshot written by checkpoint() (empty graph if there is none), replay the
+        delta file on top and keep journaling to it
+        """
+        return graph_journal.recover(cls, snapshot_path, journal_path, sync, incremental=incremental)
 
     def get_vertices(self) -> []:
         """
@@ -112,20 +451,74 @@ class UndirectedGraph:
         """
         return list(self.adj_list.keys())
 
+    def copy(self):
+        """
+        Return an independent copy of the graph, stats are not copied
+        """
+        graph = type(self)()
+        graph.adj_list = {v: NeighborSet(neighbors) for v, neighbors in self.adj_list.items()}
+        graph._edge_count = self._edge_count
+        if self.incremental:
+            graph.incremental = True
+            graph._connectivity()
+        return graph
+
+    def settle(self) -> None:
+        """
+        Nothing is deferred to the next read, reads only fill caches that stay valid
+        Counterpart of DirectedGraph.settle() for VersionedGraph
+        """
+
+    def subgraph(self, vertices, materialize=False):
+        """
+        Return subgraph induced by vertices, those vertices and every edge between them
+        A read-only UndirectedSubgraph view by default, nothing is copied
+        A standalone graph with materialize=True, unknown vertices are skipped
+        """
+        view = UndirectedSubgraph(self, vertices)
+        return view.materialize() if materialize else view
+
+    def k_hop(self, v: str, k: int, materialize=False):
+        """
+        Return subgraph induced by the vertices at most k edges away from v, see subgraph()
+        Found by a BFS that stops after k levels, empty if v is not in the graph or k < 0
+        """
+        reached = NeighborSet()
+        if v in self.adj_list and k >= 0:
+            adj_list = self.adj_list
+            reached.add(v)
+            frontier = [v]
+            for _ in range(k):
+                next_frontier = []
+                for u in frontier:
+                    for w in adj_list[u]:
+                        if w not in reached:
+                            reached.add(w)
+                            next_frontier.append(w)
+                if not next_frontier:
+                    break
+                frontier = next_frontier
+        return self.subgraph(reached, materialize)
+
+    def storage_bytes(self) -> int:
+        """
+        Return memory used by adj_list and the neighbor sets in bytes, names not counted
+        """
+        return sys.getsizeof(self.adj_list) + sum(map(sys.getsizeof, self.adj_list.values()))
+
     def get_edges(self) -> []:
         """
         Return list of edges in the graph (any order)
+        Each edge is listed once, when its first endpoint is reached, in O(V + E)
         """
         edge_list = []
-        for lists in self.adj_list:
-            for elements in self.adj_list[lists]:
-                edge_list.append(sorted((lists, elements)))
-        temp_list = []
-        [temp_list.append(edges) for edges in edge_list if edges not in temp_list]
-        final_list = []
-        [final_list.append(tuple(edges)) for edges in temp_list]
-
-        return final_list
+        done = set()
+        for u in self.adj_list:
+            done.add(u)
+            for v in self.adj_list[u]:
+                if v not in done:
+                    edge_list.append((u, v) if u < v else (v, u))
+        return edge_list
 
     def is_valid_path(self, path: []) -> bool:
         """
@@ -146,94 +539,682 @@ class UndirectedGraph:
         Return list of vertices visited during DFS search
         Vertices are picked in alphabetical order
         """
-        if v_start not in self.adj_list.keys():
-            return []
+        return list(self.iter_dfs(v_start, v_end))
 
-        visited = []
-        stack = [v_start]
+    def bfs(self, v_start, v_end=None) -> []:
+        """
+        Return list of vertices visited during BFS search
+        Vertices are picked in alphabetical order
+        """
+        return list(self.iter_bfs(v_start, v_end))
 
-        while stack:
-            vertex = stack.pop()
+    def sorted_neighbors(self, v: str) -> []:
+        """
+        Return neighbors of v in alphabetical order
+        The sorted list is cached until an edge of v changes
+        """
+        neighbors = self._sorted.get(v)
+        if neighbors is None:
+            neighbors = sorted(self.adj_list[v])
+            self._sorted[v] = neighbors
+        return neighbors
 
-            if vertex not in visited:
-                visited.append(vertex)
-                if vertex == v_end:
-                    return visited
-                for v in sorted(self.adj_list[vertex], reverse=True):
-                    stack.append(v)
+    def iter_dfs(self, v_start, v_end=None):
+        """
+        Yield vertices one at a time in DFS order, O(V + E)
+        Vertices are picked in alphabetical order
+        """
+        if v_start not in self.adj_list:
+            return
 
-        return visited
-       
+        neighbors = self.sorted_neighbors
+        call = self._begin('dfs')
+        if call is not None:
+            neighbors = call.expanding(neighbors)
+        visited = set()
+        stack = [v_start]
 
-    def bfs(self, v_start, v_end=None) -> []:
+        try:
+            while stack:
+                vertex = stack.pop()
+
+                if vertex not in visited:
+                    visited.add(vertex)
+                    yield vertex
+                    if vertex == v_end:
+                        return
+                    stack.extend(v for v in reversed(neighbors(vertex)) if v not in visited)
+        finally:
+            if call is not None:
+                call.finish()
+
+    def iter_bfs(self, v_start, v_end=None):
         """
-        Return list of vertices visited during BFS search
+        Yield vertices one at a time in BFS order, O(V + E)
         Vertices are picked in alphabetical order
         """
-        if v_start not in self.adj_list.keys():
-            return []
+        if v_start not in self.adj_list:
+            return
 
-        visited = []
-        queue = [v_start]
+        neighbors = self.sorted_neighbors
+        call = self._begin('bfs')
+        if call is not None:
+            neighbors = call.expanding(neighbors)
+        seen = {v_start}
+        queue = deque([v_start])
 
-        while queue:
-            vertex = queue.pop(0)
+        try:
+            while queue:
+                vertex = queue.popleft()
+                yield vertex
+                if vertex == v_end:
+                    return
+                for v in neighbors(vertex):
+                    if v not in seen:
+                        seen.add(v)
+                        queue.append(v)
+        finally:
+            if call is not None:
+                call.finish()
 
-            if vertex not in visited:
-                visited.append(vertex)
-            if vertex == v_end:
-                return visited
-            for v in sorted(self.adj_list[vertex]):
-                if v not in visited:
-                    queue.append(v)
+    def _connectivity(self) -> DisjointSet:
+        """
+        Return union-find of the connected components, rebuilt in O(V + E) after a change
+        """
+        return drain(self._iter_connectivity())
 
-        return visited
+    def _iter_connectivity(self, call=None):
+        """
+        Generator form of _connectivity(), yields once per vertex of a rebuild and returns the
+        union-find, the work of a rebuild is added to the counters of call if given
+        """
+        if self._components is None:
+            if call is not None:
+                call.vertices_settled += len(self.adj_list)
+                call.edges_scanned += 2 * self._edge_count
+            self._components = yield from self._iter_union()
+        return self._components
+
+    def _iter_union(self):
+        """
+        Build the union-find of the connected components, yields once per vertex
+        """
+        components = DisjointSet(self.adj_list)
+        for u in self.adj_list:
+            for v in self.adj_list[u]:
+                components.union(u, v)
+            yield
+        return components
 
     def count_connected_components(self):
         """
         Return number of connected components in the graph
         """
-        vertex_list = []
-        vertex = list(self.adj_list.keys())
-        for index in range(len(vertex)):
-            sorted_list = sorted(self.dfs(vertex[index]))
-            if sorted_list not in vertex_list:
-                vertex_list.append(sorted_list)
-
-        return len(vertex_list)
+        call = self._begin('count_connected_components')
+        count = drain(self._iter_connectivity(call)).count
+        if call is not None:
+            call.finish()
+        return count
 
     def has_cycle(self):
         """
         Return True if graph contains a cycle, False otherwise
+        A forest has exactly V - C edges, any extra edge closes a cycle
+        """
+        return drain(self._iter_has_cycle())
+
+    def _iter_has_cycle(self):
+        """
+        Generator form of has_cycle(), run by both has_cycle() and async_has_cycle()
+        """
+        call = self._begin('has_cycle')
+        try:
+            components = yield from self._iter_connectivity(call)
+            return self._edge_count > len(self.adj_list) - components.count
+        finally:
+            if call is not None:
+                call.finish()
+
+    async def async_dfs(self, v_start, v_end=None, yield_every=1000, timeout=None, offload=False,
+                        executor=None) -> []:
+        """
+        Asyncio form of dfs() that gives control back to the event loop every yield_every vertices
+        Can be cancelled, raises TimeoutError after timeout seconds and runs in executor with
+        offload=True, see graph_async.run_steps()
+        """
+        return await run_steps(collecting(self.iter_dfs(v_start, v_end)),
+                               yield_every, timeout, offload, executor)
+
+    async def async_bfs(self, v_start, v_end=None, yield_every=1000, timeout=None, offload=False,
+                        executor=None) -> []:
+        """
+        Asyncio form of bfs(), see async_dfs()
+        """
+        return await run_steps(collecting(self.iter_bfs(v_start, v_end)),
+                               yield_every, timeout, offload, executor)
+
+    async def async_has_cycle(self, yield_every=1000, timeout=None, offload=False,
+                              executor=None) -> bool:
+        """
+        Asyncio form of has_cycle(), the union-find is built with yield points, see async_dfs()
+        """
+        return await run_steps(self._iter_has_cycle(), yield_every, timeout, offload, executor)
+
+    def enable_stats(self, callback=None) -> OperationStats:
+        """
+        Turn on per-call counters for dfs, bfs, count_connected_components and has_cycle
+        callback(call_stats) is invoked after every instrumented call
+        """
+        self.stats = OperationStats(callback)
+        return self.stats
+
+    def disable_stats(self) -> None:
+        """
+        Turn off per-call counters
+        """
+        self.stats = None
+
+    def _begin(self, operation: str):
+        """
+        Start the counters of one call, None if stats are disabled
+        """
+        return None if self.stats is None else self.stats.begin(operation)
+
+    def component_of(self, v: str):
+        """
+        Return id of the connected component containing v, None if v is not in the graph
+        Ids are 0, 1, 2, ... in order of the first vertex of each component
+        """
+        if self._component_ids is None:
+            self.component_ids()
+        return self._component_ids.get(v)
+
+    def component_ids(self) -> dict:
+        """
+        Return dict mapping every vertex to the id of its connected component
+        """
+        if self._component_ids is None:
+            components = self._connectivity()
+            roots = dict()
+            self._component_ids = {v: roots.setdefault(components.find(v), len(roots))
+                                   for v in self.adj_list}
+        return dict(self._component_ids)
+
+    def same_component(self, u: str, v: str) -> bool:
+        """
+        Return True if u and v are in the same connected component
+        """
+        if u not in self.adj_list or v not in self.adj_list:
+            return False
+        components = self._connectivity()
+        return components.find(u) == components.find(v)
+
+
+
+class NameView(Mapping):
+    """
+    Read-only {name: [neighbor names]} view of an InternedUndirectedGraph
+    Neighbor lists are translated from ids when looked up
+    """
+
+    __slots__ = ('graph',)
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, v):
+        graph = self.graph
+        return [graph.names[u] for u in graph.neighbor_ids[graph.ids[v]]]
+
+    def __iter__(self):
+        return iter(self.graph.ids)
+
+    def __len__(self):
+        return len(self.graph.ids)
+
+    def __contains__(self, v):
+        return v in self.graph.ids
+
+
+class InternedUndirectedGraph(UndirectedGraph):
+    """
+    Undirected graph that interns vertex names as dense integer ids
+    - ids maps name -> id, names maps id -> name
+    - neighbors of id i are an array('i') of ids in neighbor_ids[i], 4 bytes per entry
+    - names are only translated at the API boundary, ids of removed vertices are reused
+    - adj_list is a read-only NameView
+    - adding or removing an edge scans the neighbor arrays, O(degree)
+    - incremental mode is not supported
+    """
+
+    __slots__ = ('ids', 'names', 'neighbor_ids', 'free_ids')
+
+    def __init__(self, start_edges=None, incremental=False):
+        """
+        Store graph info as id-indexed neighbor arrays
         """
+        if incremental:
+            raise ValueError("InternedUndirectedGraph does not support incremental mode")
+        self.ids = dict()
+        self.names = []
+        self.neighbor_ids = []
+        self.free_ids = []
+        self.incremental = False
+        self._edge_count = 0
+        self._sorted = dict()
+        self._components = None
+        self._component_ids = None
+        self.stats = None
+        self.journal = None
+
+        if start_edges is not None:
+            self.add_edges_bulk(start_edges)
 
-        vertices = len(self.get_vertices())
-        edges = len(self.get_edges())
-        components = self.count_connected_components()
-        if components < 2:
-            if edges >= vertices:
-                return True
+    @property
+    def adj_list(self) -> NameView:
+        """
+        Read-only {name: [neighbor names]} view of the graph
+        """
+        return NameView(self)
+
+    def _intern(self, v: str) -> int:
+        """
+        Return id of v, adding v as a new vertex if needed
+        """
+        i = self.ids.get(v)
+        if i is None:
+            if self.free_ids:
+                i = self.free_ids.pop()
+                self.names[i] = v
+                self.neighbor_ids[i] = array('i')
             else:
-                return False
-        else:
-            vertex_list = []
-            vertex = list(self.adj_list.keys())
-            for index in range(len(vertex)):
-                sorted_list = sorted(self.dfs(vertex[index]))
-                if sorted_list not in vertex_list:
-                    vertex_list.append(sorted_list)
-            for comp in vertex_list:
-                edge_list = []
-                for elements in comp:
-                    for edges in self.adj_list[elements]:
-                        edge_list.append(sorted((elements, edges)))
-                temp_list = []
-                [temp_list.append(edges) for edges in edge_list if edges not in temp_list]
-                final_list = []
-                [final_list.append(tuple(edges)) for edges in temp_list]
-                if len(final_list) >= len(comp):
-                    return True
+                i = len(self.names)
+                self.names.append(v)
+                self.neighbor_ids.append(array('i'))
+            self.ids[v] = i
+            if self.journal is not None:
+                self.journal.record('add_vertex', v)
+            self._touch()
+        return i
+
+    def _writable(self, i: int) -> array:
+        """
+        Return neighbor array of id i, copying it out of a mapped file first if needed
+        """
+        neighbors = self.neighbor_ids[i]
+        if not isinstance(neighbors, array):
+            neighbors = self.neighbor_ids[i] = array('i', neighbors)
+        return neighbors
+
+    def add_vertex(self, v: str) -> None:
+        """
+        Add new vertex to the graph
+        """
+        self._intern(v)
+
+    def add_vertices(self, vertices) -> None:
+        """
+        Add every vertex of an iterable, existing vertices are skipped
+        """
+        for v in vertices:
+            self._intern(v)
+
+    def add_edges_bulk(self, edges, rejected=None) -> None:
+        """
+        Add every (u, v) pair of an iterable with the same rules as add_edge()
+        Duplicates are skipped, self-loops are skipped and appended to rejected if given
+        """
+        for edge in edges:
+            u, v = edge
+            if u == v:
+                if rejected is not None:
+                    rejected.append(edge)
+                continue
+            self.add_edge(u, v)
+
+    def add_edge(self, u: str, v: str) -> None:
+        """
+        Add edge to the graph
+        """
+        if u == v:
+            return
+        i = self.ids.get(u)
+        j = self.ids.get(v)
+        if i is not None and j is not None and j in self.neighbor_ids[i]:
+            return
+        i = self._intern(u)
+        j = self._intern(v)
+        self._writable(i).append(j)
+        self._writable(j).append(i)
+        self._edge_count += 1
+        if self.journal is not None:
+            self.journal.record('add_edge', u, v)
+        self._touch(i, j)
+
+    def remove_edge(self, v: str, u: str) -> None:
+        """
+        Remove edge from the graph
+        """
+        i = self.ids.get(u)
+        j = self.ids.get(v)
+        if i is None or j is None or j not in self.neighbor_ids[i]:
+            return
+        self._writable(i).remove(j)
+        self._writable(j).remove(i)
+        self._edge_count -= 1
+        if self.journal is not None:
+            self.journal.record('remove_edge', v, u)
+        self._touch(i, j)
+
+    def remove_vertex(self, v: str) -> None:
+        """
+        Remove vertex and all connected edges
+        """
+        i = self.ids.pop(v, None)
+        if i is None:
+            return
+        neighbors = self.neighbor_ids[i]
+        for j in neighbors:
+            self._writable(j).remove(i)
+        self._edge_count -= len(neighbors)
+        self.names[i] = None
+        self.neighbor_ids[i] = None
+        self.free_ids.append(i)
+        if self.journal is not None:
+            self.journal.record('remove_vertex', v)
+        self._touch(i, *neighbors)
+
+    def save(self, path) -> None:
+        """
+        Write graph to a compact binary file with a vertex name table, see graph_io
+        """
+        dense = {i: k for k, i in enumerate(self.ids.values())}
+        offsets = array('q', [0])
+        targets = array('i')
+        for i in self.ids.values():
+            targets.extend(dense[j] for j in self.neighbor_ids[i])
+            offsets.append(len(targets))
+        graph_io.write_csr(path, graph_io.UNDIRECTED, offsets, targets, labels=list(self.ids))
+
+    @classmethod
+    def load(cls, path, incremental=False):
+        """
+        Memory-map a file written by save()
+        Neighbor arrays are views into the mapping, a vertex's array is copied on its first change
+        """
+        csr_file = graph_io.CSRFile(path)
+        if csr_file.kind != graph_io.UNDIRECTED:
+            raise ValueError(f"{path!s} does not hold an undirected graph")
+        graph = cls(incremental=incremental)
+        offsets, targets = csr_file.offsets, csr_file.targets
+        graph.names = csr_file.labels
+        graph.ids = {v: i for i, v in enumerate(graph.names)}
+        graph.neighbor_ids = [targets[offsets[i]:offsets[i + 1]] for i in range(csr_file.v_count)]
+        graph._edge_count = len(targets) // 2
+        return graph
+
+    def get_vertices(self) -> []:
+        """
+        Return list of vertices in the graph (any order)
+        """
+        return list(self.ids)
+
+    def copy(self):
+        """
+        Return an independent copy of the graph, neighbor arrays of a loaded graph are copied too
+        """
+        graph = type(self)()
+        graph.ids = dict(self.ids)
+        graph.names = list(self.names)
+        graph.neighbor_ids = [None if neighbors is None else array('i', neighbors)
+                              for neighbors in self.neighbor_ids]
+        graph.free_ids = list(self.free_ids)
+        graph._edge_count = self._edge_count
+        return graph
+
+    def storage_bytes(self) -> int:
+        """
+        Return memory used by the id tables and neighbor arrays in bytes, names not counted
+        """
+        return (sys.getsizeof(self.ids) + sys.getsizeof(self.names) + sys.getsizeof(self.neighbor_ids)
+                + sum(sys.getsizeof(neighbors) for neighbors in self.neighbor_ids if neighbors is not None))
+
+    def get_edges(self) -> []:
+        """
+        Return list of edges in the graph (any order)
+        Each edge is listed once, when its first endpoint is reached, in O(V + E)
+        """
+        names = self.names
+        edge_list = []
+        done = set()
+        for i in self.ids.values():
+            done.add(i)
+            u = names[i]
+            for j in self.neighbor_ids[i]:
+                if j not in done:
+                    v = names[j]
+                    edge_list.append((u, v) if u < v else (v, u))
+        return edge_list
+
+    def is_valid_path(self, path: []) -> bool:
+        """
+        Return true if provided path is valid, False otherwise
+        """
+        ids = [self.ids.get(v) for v in path]
+        if None in ids:
+            return False
+        return all(j in self.neighbor_ids[i] for i, j in zip(ids, ids[1:]))
+
+    def _sorted_ids(self, i: int) -> []:
+        """
+        Return neighbor ids of id i ordered by name, cached until an edge of i changes
+        """
+        neighbors = self._sorted.get(i)
+        if neighbors is None:
+            neighbors = sorted(self.neighbor_ids[i], key=self.names.__getitem__)
+            self._sorted[i] = neighbors
+        return neighbors
+
+    def sorted_neighbors(self, v: str) -> []:
+        """
+        Return neighbors of v in alphabetical order
+        """
+        return [self.names[j] for j in self._sorted_ids(self.ids[v])]
+
+    def iter_dfs(self, v_start, v_end=None):
+        """
+        Yield vertices one at a time in DFS order, O(V + E)
+        Vertices are picked in alphabetical order
+        """
+        start = self.ids.get(v_start)
+        if start is None:
+            return
+        end = self.ids.get(v_end, -1)
+        names = self.names
+        neighbors = self._sorted_ids
+        call = self._begin('dfs')
+        if call is not None:
+            neighbors = call.expanding(neighbors)
+        visited = set()
+        stack = [start]
+
+        try:
+            while stack:
+                vertex = stack.pop()
+
+                if vertex not in visited:
+                    visited.add(vertex)
+                    yield names[vertex]
+                    if vertex == end:
+                        return
+                    stack.extend(j for j in reversed(neighbors(vertex)) if j not in visited)
+        finally:
+            if call is not None:
+                call.finish()
+
+    def iter_bfs(self, v_start, v_end=None):
+        """
+        Yield vertices one at a time in BFS order, O(V + E)
+        Vertices are picked in alphabetical order
+        """
+        start = self.ids.get(v_start)
+        if start is None:
+            return
+        end = self.ids.get(v_end, -1)
+        names = self.names
+        neighbors = self._sorted_ids
+        call = self._begin('bfs')
+        if call is not None:
+            neighbors = call.expanding(neighbors)
+        seen = {start}
+        queue = deque([start])
+
+        try:
+            while queue:
+                vertex = queue.popleft()
+                yield names[vertex]
+                if vertex == end:
+                    return
+                for j in neighbors(vertex):
+                    if j not in seen:
+                        seen.add(j)
+                        queue.append(j)
+        finally:
+            if call is not None:
+                call.finish()
+
+    def _iter_union(self):
+        """
+        Build the union-find of the connected components over vertex ids, yields once per vertex
+        """
+        components = DisjointSet(self.ids.values())
+        for i in self.ids.values():
+            for j in self.neighbor_ids[i]:
+                components.union(i, j)
+            yield
+        return components
+
+    def component_ids(self) -> dict:
+        """
+        Return dict mapping every vertex to the id of its connected component
+        """
+        if self._component_ids is None:
+            components = self._connectivity()
+            roots = dict()
+            self._component_ids = {v: roots.setdefault(components.find(i), len(roots))
+                                   for v, i in self.ids.items()}
+        return dict(self._component_ids)
+
+    def same_component(self, u: str, v: str) -> bool:
+        """
+        Return True if u and v are in the same connected component
+        """
+        if u not in self.ids or v not in self.ids:
             return False
+        components = self._connectivity()
+        return components.find(self.ids[u]) == components.find(self.ids[v])
+
+
+class InducedView(Mapping):
+    """
+    Read-only {name: [neighbor names]} view of an UndirectedSubgraph
+    Neighbor lists are filtered from the underlying graph when looked up
+    """
+
+    __slots__ = ('view',)
+
+    def __init__(self, view):
+        self.view = view
+
+    def __getitem__(self, v):
+        vertices = self.view.vertices
+        if v not in vertices:
+            raise KeyError(v)
+        return [u for u in self.view.graph.adj_list[v] if u in vertices]
+
+    def __iter__(self):
+        return iter(self.view.vertices)
+
+    def __len__(self):
+        return len(self.view.vertices)
+
+    def __contains__(self, v):
+        return v in self.view.vertices
+
+
+class UndirectedSubgraph(UndirectedGraph):
+    """
+    Read-only view of the subgraph of an undirected graph induced by a set of its vertices
+    - nothing is copied, neighbors are filtered from the graph when they are read
+    - adj_list is a read-only InducedView
+    - every read method works on the view, changing it raises TypeError, see materialize()
+    - the graph must not change while the view is in use, take views of a copy() or
+      Snapshot of a graph that is being written to
+    """
+
+    __slots__ = ('graph', 'vertices')
+
+    def __init__(self, graph, vertices):
+        """
+        Store the graph and the vertices, a view of a view filters the underlying graph directly
+        Counting the edges of the view is O(sum of the degrees of its vertices)
+        """
+        if isinstance(graph, UndirectedSubgraph):
+            vertices = [v for v in vertices if v in graph.vertices]
+            graph = graph.graph
+        adj_list = graph.adj_list
+        self.graph = graph
+        self.vertices = NeighborSet.fromkeys(v for v in vertices if v in adj_list)
+        self.incremental = False
+        self._edge_count = sum(u in self.vertices for v in self.vertices for u in adj_list[v]) // 2
+        self._sorted = dict()
+        self._components = None
+        self._component_ids = None
+        self.stats = None
+        self.journal = None
+
+    @property
+    def adj_list(self) -> InducedView:
+        """
+        Read-only {name: [neighbor names]} view of the subgraph
+        """
+        return InducedView(self)
+
+    def _read_only(self, *args) -> None:
+        """
+        Refuse a change, the view is read-only
+        """
+        raise TypeError("subgraph view is read-only, materialize() returns a standalone copy")
+
+    add_vertex = add_vertices = add_edges_bulk = add_edge = remove_edge = remove_vertex = _read_only
+
+    def sorted_neighbors(self, v: str) -> []:
+        """
+        Return neighbors of v in alphabetical order, filtered from those of the graph
+        """
+        vertices = self.vertices
+        return [u for u in self.graph.sorted_neighbors(v) if u in vertices]
+
+    def materialize(self):
+        """
+        Return the view as a standalone graph of the same class as the underlying graph
+        """
+        graph = type(self.graph)()
+        graph.add_vertices(self.vertices)
+        graph.add_edges_bulk(self.get_edges())
+        return graph
+
+    def copy(self):
+        """
+        Return an independent copy of the view, see materialize()
+        """
+        return self.materialize()
+
+    def storage_bytes(self) -> int:
+        """
+        Return memory used by the vertex set in bytes, the edges belong to the underlying graph
+        """
+        return sys.getsizeof(self.vertices)
 
 
 if __name__ == '__main__':
@@ -327,3 +1308,57 @@ if __name__ == '__main__':
         u, v = edge
         g.add_edge(u, v) if command == 'add' else g.remove_edge(u, v)
         print('{:<10}'.format(case), g.has_cycle())
+
+
+    print("\ncomponent_of() / same_component() example")
+    print("-----------------------------------------")
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = UndirectedGraph(edges)
+    print(g.component_ids())
+    for u, v in ['AH', 'AQ', 'FQ']:
+        print(u, v, g.component_of(u), g.component_of(v), g.same_component(u, v))
+
+
+    print("\nincremental has_cycle() example")
+    print("-------------------------------")
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = UndirectedGraph(edges, incremental=True)
+    for case in ('remove BH', 'remove AE', 'remove CE', 'remove BD', 'add BH', 'remove GQ', 'add QF'):
+        command, edge = case.split()
+        u, v = edge
+        g.add_edge(u, v) if command == 'add' else g.remove_edge(u, v)
+        print('{:<10}'.format(case), g.count_connected_components(), g.has_cycle())
+
+
+    print("\nInternedUndirectedGraph example")
+    print("-------------------------------")
+    edges = ['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG']
+    g = InternedUndirectedGraph(edges)
+    print(g)
+    print(g.ids, g.neighbor_ids[g.ids['C']], sep='\n')
+    for case in 'ABCDEGH':
+        print(f'{case} DFS:{g.dfs(case)} BFS:{g.bfs(case)}')
+
+
+    print("\nstorage_bytes() example")
+    print("-----------------------")
+    edges = [(f'v{i}', f'v{(i * 7 + 3) % 500}') for i in range(500)]
+    for cls in (UndirectedGraph, InternedUndirectedGraph):
+        print('{:<24}'.format(cls.__name__), cls(edges).storage_bytes())
+
+
+    print("\nenable_stats() example")
+    print("----------------------")
+    g = UndirectedGraph(['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG'])
+    g.enable_stats(lambda call: print(call.operation, call.vertices_settled, call.edges_scanned))
+    g.bfs('A')
+    g.count_connected_components()
+
+
+    print("\nk_hop() example")
+    print("---------------")
+    g = UndirectedGraph(['AE', 'AC', 'BE', 'CE', 'CD', 'CB', 'BD', 'ED', 'BH', 'QG', 'FG'])
+    view = g.k_hop('H', 2)
+    print(view, view.get_edges())
+    print(view.dfs('H'), view.bfs('H'), view.has_cycle())
+    print(g.subgraph('ABH', materialize=True))